@@ -3,6 +3,10 @@ from tkinter import filedialog
 from tkinter import ttk
 
 import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageTk
 
 from openai import OpenAI
@@ -12,12 +16,282 @@ import ollama
 from ollama import ResponseError
 
 import base64
+import time
 
 # Replace with your OpenAI API key
 OPENAI_API_KEY = "your_openai_api_key"
 
+# Image types picked up when scanning a directory (compared lower-case)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+# Names handed from the scan thread / inserted into the listbox per step
+SCAN_BATCH_SIZE = 500
+# How often the GUI drains scan results, and how often a watched folder is re-checked
+SCAN_POLL_MS = 50
+WATCH_INTERVAL_MS = 3000
+
+# Preview size on the canvas
+DISPLAY_SIZE = (400, 400)
+# Listbox neighbours decoded ahead on each side of the selection, and the memory the decoded previews may use
+PREFETCH_RADIUS = 3
+PREFETCH_CACHE_MB = 128
+
+MODEL_LOCAL = "Local Model"
+MODEL_OPENAI = "Open AI model"
+MODEL_RACE = "Race local vs OpenAI"
+MODEL_COMPARE = "Compare local and OpenAI"
+# Race mode starts the local model at once and OpenAI after this many seconds, or as soon
+# as the local model fails (skipped entirely if the local rating is already in). 0 starts both together.
+HEDGE_DELAY_SECONDS = 0.0
+RESULT_POLL_MS = 100
+
+LOCAL_RATING_PROMPT = ("You are an expert image evaluator for on online shopping site. "
+                       "Rate the image from 1 to 10.  Keep the response to only 100 words or less.")
+OPENAI_RATING_PROMPT = "You are an expert image evaluator for an online shopping site. Rate the image from 1 to 10"
+
+
+def scan_images(root_dir, dir_mtimes, should_stop=lambda: False):
+    """Walk root_dir with os.scandir, yielding lists of image paths relative to root_dir.
+
+    Each directory's mtime is recorded in dir_mtimes, keyed by its normalised
+    path, so a watcher can later re-list only the directories that changed.
+    """
+    stack = [root_dir]
+    batch = []
+    while stack and not should_stop():
+        current = stack.pop()
+        try:
+            dir_mtimes[os.path.normpath(current)] = os.stat(current).st_mtime
+            with os.scandir(current) as entries:
+                entries = sorted(entries, key=lambda e: e.name.lower())
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    batch.append(os.path.relpath(entry.path, root_dir))
+            except OSError:
+                continue
+            if len(batch) >= SCAN_BATCH_SIZE:
+                yield batch
+                batch = []
+        # reversed so subdirectories come off the stack in name order
+        stack.extend(reversed(subdirs))
+    if batch:
+        yield batch
+
+def rescan_changed_dirs(image_dir, dir_mtimes, known):
+    """Re-list only the directories whose mtime changed since scan_images recorded them.
+
+    known is the set of image paths (relative to image_dir) currently listed.
+    Returns (added, removed, new_mtimes).
+    """
+    added, removed, new_mtimes = [], [], {}
+    known_by_dir = {}
+    for rel in known:
+        known_by_dir.setdefault(os.path.normpath(os.path.join(image_dir, os.path.dirname(rel))), set()).add(rel)
+
+    for directory, old_mtime in dir_mtimes.items():
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            # directory is gone, and everything that was under it
+            removed.extend(known_by_dir.get(directory, ()))
+            continue
+        if mtime == old_mtime:
+            new_mtimes[directory] = mtime
+            continue
+        current, new_subdirs = set(), []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if os.path.normpath(entry.path) not in dir_mtimes:
+                            new_subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                        current.add(os.path.relpath(entry.path, image_dir))
+        except OSError:
+            # keep the old mtime so the next tick lists this directory again
+            new_mtimes[directory] = old_mtime
+            continue
+        new_mtimes[directory] = mtime
+        for subdir in new_subdirs:
+            for batch in scan_images(subdir, new_mtimes):
+                added.extend(os.path.relpath(os.path.join(subdir, p), image_dir) for p in batch)
+        before = known_by_dir.get(directory, set())
+        added.extend(sorted(current - before))
+        removed.extend(before - current)
+    return added, removed, new_mtimes
+
+def local_rating_stream(image_path):
+    """Yield the local llava model's rating text as it streams in"""
+    stream = ollama.chat(
+        model = "llava:7b",
+        stream = True,
+        messages=[
+            {
+                'role': 'user',
+                'content': LOCAL_RATING_PROMPT,
+                'images': [image_path]
+            }
+        ]
+    )
+    for chunk in stream:
+        yield chunk.message.content
+
+
+def openai_rating_stream(image_path, prompt=OPENAI_RATING_PROMPT):
+    """Yield OpenAI's rating text as it streams in"""
+    with open(image_path, "rb") as image_file:
+        b64_image = base64.b64encode(image_file.read()).decode("utf-8")
+
+    client = OpenAI(api_key=OPENAI_API_KEY,)
+    response = client.responses.create(
+        model="gpt-4o-mini",
+        input=[
+            {
+                "role": "user",
+                "content": [
+                    {"type": "input_text", "text": prompt},
+                    {"type": "input_image", "image_url": f"data:image/png;base64,{b64_image}"},
+                ],
+            }
+        ],
+        stream=True
+    )
+    try:
+        for chunk in response:
+            if hasattr(chunk, "delta"):
+                yield chunk.delta
+    finally:
+        response.close()
+
+
+RATING_BACKENDS = {
+    MODEL_LOCAL: local_rating_stream,
+    MODEL_OPENAI: openai_rating_stream,
+}
+
+
+class RatingCancelled(Exception):
+    pass
+
+
+def collect_rating(backend, image_path, cancel):
+    """Run one backend to completion on the calling thread; stops early once cancel is set"""
+    stream = RATING_BACKENDS[backend](image_path)
+    parts = []
+    try:
+        for text in stream:
+            if cancel.is_set():
+                raise RatingCancelled()
+            parts.append(text)
+    finally:
+        stream.close()  # closes the underlying HTTP response when abandoned part-way
+    return "".join(parts)
+
+
+def decode_for_display(path):
+    """Open and resize an image to the preview size, in a mode ImageTk.PhotoImage accepts"""
+    with Image.open(path) as image:
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        return image.resize(DISPLAY_SIZE, Image.Resampling.LANCZOS)
+
+
+class PreviewCache:
+    """Thread-safe LRU of decoded, resized previews, bounded by their pixel memory"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def size_of(image):
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key):
+        with self.lock:
+            image = self.items.get(key)
+            if image is not None:
+                self.items.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        size = self.size_of(image)
+        with self.lock:
+            if key in self.items:
+                self.used_bytes -= self.size_of(self.items.pop(key))
+            self.items[key] = image
+            self.used_bytes += size
+            # Evict least recently used, but never the entry just added
+            while self.used_bytes > self.max_bytes and len(self.items) > 1:
+                _, evicted = self.items.popitem(last=False)
+                self.used_bytes -= self.size_of(evicted)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.used_bytes = 0
+
+
+class ImagePrefetcher:
+    """Decodes the images around the current selection on background threads into a PreviewCache"""
+
+    def __init__(self, cache, workers=2):
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.lock = threading.Lock()
+        self.wanted = set()
+        self.in_flight = set()
+
+    def get(self, path):
+        """Decoded preview for path, from the cache or decoded now on the calling thread"""
+        image = self.cache.get(path)
+        if image is None:
+            image = decode_for_display(path)
+            self.cache.put(path, image)
+        return image
+
+    def prefetch(self, paths):
+        """Queue paths (nearest first); anything queued earlier but no longer wanted is skipped"""
+        with self.lock:
+            self.wanted = set(paths)
+            for path in paths:
+                if path not in self.in_flight and path not in self.cache:
+                    self.in_flight.add(path)
+                    self.executor.submit(self._decode, path)
+
+    def _decode(self, path):
+        try:
+            with self.lock:
+                if path not in self.wanted:
+                    return
+            if path not in self.cache:
+                self.cache.put(path, decode_for_display(path))
+        except Exception:
+            pass  # unreadable files show their error when actually selected
+        finally:
+            with self.lock:
+                self.in_flight.discard(path)
+
+    def reset(self):
+        with self.lock:
+            self.wanted = set()
+        self.cache.clear()
+
+
 class ImageBrowser:
-    def __init__(self, root):
+    def __init__(self, root, prefetch_radius=PREFETCH_RADIUS, prefetch_cache_mb=PREFETCH_CACHE_MB,
+                 hedge_delay=HEDGE_DELAY_SECONDS):
         self.root = root
         self.root.title("Image Browser")
         self.current_selected_image = None
@@ -26,8 +300,21 @@ class ImageBrowser:
         self.frame_left = tk.Frame(self.root)
         self.frame_left.pack(side=tk.LEFT, fill=tk.Y)
 
+        # Filter box: narrows the list to names containing the typed text
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add("write", self.on_filter_change)
+        self.filter_entry = tk.Entry(self.frame_left, textvariable=self.filter_text)
+        self.filter_entry.pack(fill=tk.X)
+
         self.listbox = tk.Listbox(self.frame_left)
         self.listbox.pack(fill=tk.BOTH, expand=True)
+
+        self.status_text = tk.StringVar(value="No directory chosen")
+        tk.Label(self.frame_left, textvariable=self.status_text, anchor="w").pack(fill=tk.X)
+
+        self.watch_folder = tk.BooleanVar(value=False)
+        self.watch_folder.trace_add("write", self.on_watch_change)
+        tk.Checkbutton(self.frame_left, text="Watch folder for new images", variable=self.watch_folder).pack(anchor="w")
         self.listbox.bind("<<ListboxSelect>>", self.load_image)
 
         # Button to open file dialog
@@ -55,8 +342,19 @@ class ImageBrowser:
 
         self.scrollbar = tk.Scrollbar(self.rating_frame, command=self.rating_text.yview)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.model_options = ["Local Model", "Open AI model"]
+
+        # Second pane, shown only in compare mode: local result on the left, OpenAI on the right
+        self.compare_frame = tk.Frame(self.frame_right)
+        self.compare_text = tk.Text(self.compare_frame, height=40, width=50, wrap="word", yscrollcommand=lambda *args: self.compare_scrollbar.set(*args))
+        self.compare_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.compare_scrollbar = tk.Scrollbar(self.compare_frame, command=self.compare_text.yview)
+        self.compare_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.rating_frame.pack_configure(side=tk.LEFT)
+
+        self.hedge_delay = hedge_delay
+        self.rating_run = 0
+
+        self.model_options = [MODEL_LOCAL, MODEL_OPENAI, MODEL_RACE, MODEL_COMPARE]
         self.model_choice = tk.StringVar(value=self.model_options[0])
         self.model_choice.trace_add("write", self.on_selection_change)
         ttk.Label(root, text="Choose your model:").pack(pady=10)
@@ -65,33 +363,184 @@ class ImageBrowser:
         option_menu = ttk.OptionMenu(root, self.model_choice, self.model_options[0], *self.model_options)
         option_menu.pack()
 
+        # image_list is the in-memory index of every image found (paths relative to image_dir);
+        # filtered_list is what the listbox shows, in the same order as its rows.
         self.image_list = []
+        self.image_set = set()
+        self.filtered_list = []
         self.image_dir = ""
         self.img_path = ""
 
+        # Scan/watch results arrive from worker threads through this queue; only the Tk thread touches widgets
+        self.scan_queue = queue.Queue()
+        self.scan_generation = 0
+        self.scanning = False
+        self.watch_pending = False
+        self.watch_job = None
+        self.dir_mtimes = {}
+        self.pending_inserts = []
+        self.populate_job = None
+
+        # Neighbouring images are decoded ahead so arrow-key browsing shows them instantly
+        self.prefetch_radius = prefetch_radius
+        self.prefetcher = ImagePrefetcher(PreviewCache(prefetch_cache_mb * 1024 * 1024))
+
     def choose_directory(self):
-        """Open file dialog and list .jpg files"""
-        self.image_dir = filedialog.askdirectory()
-        if self.image_dir:
-            self.image_list = [f for f in os.listdir(self.image_dir) if f.lower().endswith(".jpg")]
-            self.listbox.delete(0, tk.END)
-            for img in self.image_list:
-                self.listbox.insert(tk.END, img)
+        """Open file dialog and scan it for images in the background"""
+        image_dir = filedialog.askdirectory()
+        if not image_dir:
+            return
+        self.image_dir = image_dir
+        # A new generation makes any scan still running for the previous directory stop and be ignored
+        self.scan_generation += 1
+        self.image_list = []
+        self.image_set = set()
+        self.filtered_list = []
+        self.dir_mtimes = {}
+        self.pending_inserts = []
+        self.prefetcher.reset()
+        self.listbox.delete(0, tk.END)
+        self.scanning = True
+        self.watch_pending = False
+        self.status_text.set("Scanning...")
+
+        generation = self.scan_generation
+        threading.Thread(target=self.scan_worker, args=(image_dir, generation), daemon=True).start()
+        self.root.after(SCAN_POLL_MS, self.process_scan_queue)
+
+    def scan_worker(self, image_dir, generation):
+        """Background thread: walk image_dir and post batches of relative paths"""
+        dir_mtimes = {}
+        for batch in scan_images(image_dir, dir_mtimes, lambda: generation != self.scan_generation):
+            self.scan_queue.put(("batch", generation, batch))
+        self.scan_queue.put(("done", generation, dir_mtimes))
+
+    def watch_worker(self, image_dir, generation, dir_mtimes, known):
+        """Background thread: re-list only directories whose mtime changed since the last look"""
+        self.scan_queue.put(("changes", generation, rescan_changed_dirs(image_dir, dir_mtimes, known)))
+
+    def process_scan_queue(self):
+        """Tk thread: apply queued scan results, inserting into the listbox a batch per callback"""
+        try:
+            while True:
+                kind, generation, payload = self.scan_queue.get_nowait()
+                if generation != self.scan_generation:
+                    continue
+                if kind == "batch":
+                    self.add_images(payload)
+                elif kind == "done":
+                    self.dir_mtimes = payload
+                    self.scanning = False
+                elif kind == "changes":
+                    added, removed, self.dir_mtimes = payload
+                    self.watch_pending = False
+                    if removed:
+                        self.remove_images(removed)
+                    if added:
+                        self.add_images(added)
+        except queue.Empty:
+            pass
+
+        self.update_status()
+        if self.scanning or self.watch_pending:
+            self.root.after(SCAN_POLL_MS, self.process_scan_queue)
+
+    def add_images(self, paths):
+        """Add newly found paths to the index and queue the ones matching the filter for the listbox"""
+        paths = [p for p in paths if p not in self.image_set]
+        self.image_list.extend(paths)
+        self.image_set.update(paths)
+        needle = self.filter_text.get().strip().lower()
+        matches = [p for p in paths if needle in p.lower()] if needle else paths
+        self.filtered_list.extend(matches)
+        self.queue_listbox_rows(matches)
+
+    def remove_images(self, paths):
+        gone = set(paths)
+        self.image_list = [p for p in self.image_list if p not in gone]
+        self.image_set.difference_update(gone)
+        self.apply_filter()
+
+    def queue_listbox_rows(self, rows):
+        self.pending_inserts.extend(rows)
+        if self.populate_job is None:
+            self.populate_job = self.root.after_idle(self.insert_pending_rows)
+
+    def insert_pending_rows(self):
+        """Insert one batch of rows, then yield to the event loop so the GUI stays responsive"""
+        batch = self.pending_inserts[:SCAN_BATCH_SIZE]
+        del self.pending_inserts[:SCAN_BATCH_SIZE]
+        if batch:
+            self.listbox.insert(tk.END, *batch)
+        if self.pending_inserts:
+            self.populate_job = self.root.after(1, self.insert_pending_rows)
+        else:
+            self.populate_job = None
+
+    def apply_filter(self):
+        """Rebuild the listbox from the in-memory index for the current filter text"""
+        needle = self.filter_text.get().strip().lower()
+        self.filtered_list = [p for p in self.image_list if needle in p.lower()] if needle else list(self.image_list)
+        self.pending_inserts = []
+        self.listbox.delete(0, tk.END)
+        self.queue_listbox_rows(self.filtered_list)
+        self.update_status()
+
+    def on_filter_change(self, *args):
+        self.apply_filter()
+
+    def on_watch_change(self, *args):
+        if self.watch_folder.get() and self.watch_job is None:
+            self.watch_job = self.root.after(WATCH_INTERVAL_MS, self.watch_tick)
+
+    def watch_tick(self):
+        """Periodically check the chosen directory for added/removed images while watching is on"""
+        self.watch_job = None
+        if not self.watch_folder.get():
+            return
+        if self.image_dir and not self.scanning and not self.watch_pending:
+            self.watch_pending = True
+            threading.Thread(
+                target=self.watch_worker,
+                args=(self.image_dir, self.scan_generation, dict(self.dir_mtimes), list(self.image_list)),
+                daemon=True,
+            ).start()
+            self.root.after(SCAN_POLL_MS, self.process_scan_queue)
+        self.watch_job = self.root.after(WATCH_INTERVAL_MS, self.watch_tick)
+
+    def update_status(self):
+        total = len(self.image_list)
+        shown = len(self.filtered_list)
+        text = f"{shown} of {total} images" if shown != total else f"{total} images"
+        if self.scanning:
+            text += " (scanning...)"
+        self.status_text.set(text)
 
     def load_image(self, event):
         """Load selected image onto canvas"""
         selected_index = self.listbox.curselection()
         if selected_index:
-            self.img_path = os.path.join(self.image_dir, self.image_list[selected_index[0]])
+            self.img_path = os.path.join(self.image_dir, self.filtered_list[selected_index[0]])
             self.current_selected_image = self.img_path
-            image = Image.open(self.img_path)
-            image = image.resize((400, 400), Image.Resampling.LANCZOS)
+            image = self.prefetcher.get(self.img_path)
             self.img = ImageTk.PhotoImage(image)
 
             self.canvas.delete("all")
-            self.canvas.create_image(200, 200, image=self.img)
+            self.canvas.create_image(DISPLAY_SIZE[0] // 2, DISPLAY_SIZE[1] // 2, image=self.img)
 
+            self.rating_run += 1  # a race/compare for the previous image no longer applies
             self.rating_text.delete("1.0", tk.END)
+            self.compare_text.delete("1.0", tk.END)
+            self.prefetch_neighbours(selected_index[0])
+
+    def prefetch_neighbours(self, index):
+        """Queue the next/previous prefetch_radius entries, nearest first and next before previous"""
+        paths = []
+        for distance in range(1, self.prefetch_radius + 1):
+            for neighbour in (index + distance, index - distance):
+                if 0 <= neighbour < len(self.filtered_list):
+                    paths.append(os.path.join(self.image_dir, self.filtered_list[neighbour]))
+        self.prefetcher.prefetch(paths)
 
     def get_ai_rating(self):
         """Get the selected index and then call the function that gets the ai help"""
@@ -102,18 +551,115 @@ class ImageBrowser:
         wait_label.pack()
         wait_window.update()
 
-        if self.model_choice.get() == "Open AI model":
+        if self.model_choice.get() == MODEL_OPENAI:
             self.get_ai_rating_openai(wait_window)
 
-        if self.model_choice.get() == "Local Model":
+        if self.model_choice.get() == MODEL_LOCAL:
             self.get_ai_rating_local(image=self.img_path, wait_window=wait_window)
 
+        if self.model_choice.get() in (MODEL_RACE, MODEL_COMPARE):
+            self.get_ai_rating_multi(self.model_choice.get(), wait_window)
+
+    def get_ai_rating_multi(self, mode, wait_window):
+        """Run the local and OpenAI backends concurrently for race or compare mode"""
+        if not self.img_path:
+            wait_window.destroy()
+            self.rating_text.insert('end', "You need to select a photo before running the analysis")
+            return
+
+        # A new run id makes results still arriving from an earlier run be ignored
+        self.rating_run += 1
+        run = self.rating_run
+        results = queue.Queue()
+        finished = threading.Event()
+        cancels = {backend: threading.Event() for backend in RATING_BACKENDS}
+        image_path = self.img_path
+        started = time.perf_counter()
+
+        # Set when the local backend stops, whether it produced a rating or failed
+        local_done = threading.Event()
+        local_ok = threading.Event()
+
+        def worker(backend, delay):
+            # Hedge: give the local backend a head start, cut short as soon as it finishes,
+            # and skip this one only if that finish was a rating
+            if delay:
+                local_done.wait(delay)
+                if local_ok.is_set() or cancels[backend].is_set():
+                    return
+            t0 = time.perf_counter()
+            try:
+                text = collect_rating(backend, image_path, cancels[backend])
+                if backend == MODEL_LOCAL:
+                    local_ok.set()
+                results.put((backend, True, text, time.perf_counter() - t0))
+            except RatingCancelled:
+                pass
+            except AuthenticationError:
+                results.put((backend, False, "You will need to add your OpenAI key in order to use this model.", time.perf_counter() - t0))
+            except Exception as e:
+                results.put((backend, False, f"{type(e).__name__}: {e}", time.perf_counter() - t0))
+            finally:
+                if backend == MODEL_LOCAL:
+                    local_done.set()
+
+        delay = self.hedge_delay if mode == MODEL_RACE else 0
+        threading.Thread(target=worker, args=(MODEL_LOCAL, 0), daemon=True).start()
+        threading.Thread(target=worker, args=(MODEL_OPENAI, delay), daemon=True).start()
+
+        state = {"pending": set(RATING_BACKENDS), "errors": [], "waiting": True}
+
+        def close_wait_window():
+            if state["waiting"]:
+                state["waiting"] = False
+                wait_window.destroy()
+
+        def poll():
+            if run != self.rating_run:
+                for cancel in cancels.values():
+                    cancel.set()
+                close_wait_window()
+                return
+            try:
+                while True:
+                    backend, ok, text, latency = results.get_nowait()
+                    state["pending"].discard(backend)
+                    total = time.perf_counter() - started
+                    if mode == MODEL_COMPARE:
+                        close_wait_window()
+                        pane = self.rating_text if backend == MODEL_LOCAL else self.compare_text
+                        pane.delete("1.0", tk.END)
+                        pane.insert('end', f"{backend} ({latency:.1f}s)\n\n{text}")
+                    elif ok:
+                        # Race winner: show it and cancel the slower backend
+                        finished.set()
+                        for cancel in cancels.values():
+                            cancel.set()
+                        close_wait_window()
+                        self.rating_text.delete("1.0", tk.END)
+                        self.rating_text.insert('end', f"{backend} answered first ({total:.1f}s)\n\n{text}")
+                        return
+                    else:
+                        state["errors"].append(f"{backend}: {text}")
+            except queue.Empty:
+                pass
+
+            if state["pending"] and not (mode == MODEL_RACE and finished.is_set()):
+                self.root.after(RESULT_POLL_MS, poll)
+            elif mode == MODEL_RACE:
+                # Neither backend produced a rating
+                close_wait_window()
+                self.rating_text.delete("1.0", tk.END)
+                self.rating_text.insert('end', "\n".join(state["errors"]))
+
+        self.root.after(RESULT_POLL_MS, poll)
+
     def get_ai_rating_openai(self, wait_window):
         """Get OpenAI rating for the selected criterion"""
         # Request OpenAI's evaluation 
         try:
             
-            self.query_openai("You are an expert image evaluator for an online shopping site. Rate the image from 1 to 10", wait_window)
+            self.query_openai(OPENAI_RATING_PROMPT, wait_window)
 
         except AuthenticationError:
             wait_window.destroy()
@@ -121,25 +667,13 @@ class ImageBrowser:
         
     def get_ai_rating_local(self, image, wait_window):
         """Get local model rating for the selected criterion"""
-        stream = ollama.chat(
-            model = "llava:7b",
-            stream = True,
-            messages=[
-                {
-                    'role': 'user',
-                    'content': f"You are an expert image evaluator for on online shopping site. " 
-                    "Rate the image from 1 to 10.  Keep the response to only 100 words or less.",
-                    'images': [image]
-                }
-            ] 
-        )
         try:
 
-            for chunk in stream:
+            for text in local_rating_stream(image):
                 if wait_window:
                     wait_window.destroy()
 
-                self.add_text(chunk.message.content)
+                self.add_text(text)
 
         except ResponseError:
             wait_window.destroy()
@@ -151,33 +685,21 @@ class ImageBrowser:
         self.rating_text.update_idletasks()
 
     def query_openai(self, prompt, wait_window):
-        with open(self.current_selected_image, "rb") as image_file:
-            b64_image = base64.b64encode(image_file.read()).decode("utf-8")
-        
-        client = OpenAI(api_key=OPENAI_API_KEY,)
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": prompt},
-                        {"type": "input_image", "image_url": f"data:image/png;base64,{b64_image}"},
-                    ],
-                }
-            ],
-            stream=True 
-        )
-        for chunk in response:
+        for text in openai_rating_stream(self.current_selected_image, prompt):
             if wait_window:
                 wait_window.destroy()
 
-            if hasattr(chunk, "delta"):
-                self.add_text(chunk.delta)
+            self.add_text(text)
 
     def on_selection_change(self, *args):
         print("Selected model:", self.model_choice.get())
+        self.rating_run += 1  # abandon any race/compare still running
         self.rating_text.delete("1.0", tk.END)
+        self.compare_text.delete("1.0", tk.END)
+        if self.model_choice.get() == MODEL_COMPARE:
+            self.compare_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        else:
+            self.compare_frame.pack_forget()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,68 @@
+"""Window aggregates over the importer's cumulative stat tables.
+
+``player_cumulative_stats`` and ``team_cumulative_stats`` hold running totals
+per game in date order, so the totals for any window are the difference of
+two rows: the window's last game minus the game just before it. Each call is
+at most two indexed single-row lookups, however much history there is.
+
+Windows:
+    last_n=4                      the player's last 4 games
+    season=2025                   the whole 2025 season
+    season=2025, through_week=8   weeks 1-8 of 2025
+    season=2025, through_week=8, last_n=4
+                                  the 4 games up to and including week 8
+"""
+from django.db import DatabaseError
+
+from .models import PlayerCumulativeStats, TeamCumulativeStats
+
+PLAYER_FIELDS = (
+    "rush_attempts", "rush_yards", "rush_tds",
+    "receptions", "rec_yards", "rec_tds", "targets", "yards_after_catch",
+)
+TEAM_FIELDS = ("rush_yards_allowed", "pass_yards_allowed", "total_yards_allowed")
+
+
+async def _window(model, key_filter, fields, last_n=None, season=None, through_week=None):
+    rows = model.objects.filter(**key_filter)
+    try:
+        end_qs = rows
+        if season is not None:
+            end_qs = end_qs.filter(season=season)
+            if through_week is not None:
+                end_qs = end_qs.filter(week__lte=through_week)
+        end = await end_qs.order_by("-seq").afirst()
+        if end is None:
+            return None
+
+        if last_n is not None:
+            start = await rows.filter(seq=end.seq - last_n).afirst() if end.seq > last_n else None
+        elif season is not None:
+            start = await rows.filter(season__lt=season).order_by("-seq").afirst()
+        else:
+            start = None
+    except DatabaseError:
+        # cumulative tables not built yet for this database
+        return None
+
+    games = end.seq - (start.seq if start else 0)
+    totals = {f: getattr(end, f) - (getattr(start, f) if start else 0) for f in fields}
+    return {
+        "games": games,
+        "through_date": end.date,
+        "through_week": end.week,
+        "totals": totals,
+        "per_game": {f: round(v / games, 2) for f, v in totals.items()} if games else {},
+    }
+
+
+async def aplayer_window(player_name, last_n=None, season=None, through_week=None):
+    """Rushing/receiving totals and per-game rates for a player over a window, or None."""
+    return await _window(PlayerCumulativeStats, {"player": player_name}, PLAYER_FIELDS,
+                         last_n, season, through_week)
+
+
+async def ateam_defense_window(team_name, last_n=None, season=None, through_week=None):
+    """Yards allowed totals and per-game rates for a team's defense over a window, or None."""
+    return await _window(TeamCumulativeStats, {"team": team_name}, TEAM_FIELDS,
+                         last_n, season, through_week)
@@ -0,0 +1,58 @@
+"""Cache helpers for the NFL views.
+
+Every key embeds the data-version stamp that ``nfl_data_manager.py`` bumps
+after an import, so entries written against old data are simply never read
+again and age out of the cache on their own; nothing here relies on TTLs.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .models import DataVersion
+
+_MISSING = object()
+
+
+def get_data_version():
+    """Current import stamp, or 0 for a database the importer has not stamped yet."""
+    try:
+        version = DataVersion.objects.filter(id=1).values_list("version", flat=True).first()
+    except DatabaseError:
+        return 0
+    return version or 0
+
+
+async def aget_data_version():
+    try:
+        version = await DataVersion.objects.filter(id=1).values_list("version", flat=True).afirst()
+    except DatabaseError:
+        return 0
+    return version or 0
+
+
+def versioned_key(namespace, *parts, version=None):
+    """Build a cache key like ``nfl:v7:rb_detail:<digest>`` for the given parts."""
+    if version is None:
+        version = get_data_version()
+    raw = "\x1f".join(str(p) for p in parts)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"nfl:v{version}:{namespace}:{digest}"
+
+
+def get_or_compute(key, compute):
+    """Return the cached value for ``key``; on a miss call ``compute()`` and store it."""
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+
+async def aget_or_compute(key, compute):
+    """Async ``get_or_compute``; ``compute`` is a zero-argument callable returning an awaitable."""
+    value = await cache.aget(key, _MISSING)
+    if value is _MISSING:
+        value = await compute()
+        await cache.aset(key, value)
+    return value
@@ -0,0 +1,57 @@
+"""Opponent and matchup lookups backed by the importer's ``game_teams`` table.
+
+Each lookup is a single query on an indexed column, replacing the old chain
+of guesses against ``defense_stats``. A database the importer has not
+migrated yet has no ``game_teams`` table; every lookup then finds nothing.
+"""
+from datetime import date
+
+from django.db import DatabaseError
+from django.db.models import Exists, OuterRef
+
+from .models import GameTeam, RushingStats
+
+
+async def alast_matchup(player_name):
+    """The most recent game the player has a rushing row in, from their team's side."""
+    player_rows = RushingStats.objects.filter(player=player_name)
+    same_team = player_rows.filter(game_id=OuterRef("game_id"), team=OuterRef("team"))
+    try:
+        return await (
+            GameTeam.objects
+            .filter(game_id__in=player_rows.values("game_id"))
+            .filter(Exists(same_team))
+            .order_by("-date", "-game_id")
+            .afirst()
+        )
+    except DatabaseError:
+        return None
+
+
+async def aupcoming_matchup(team, today=None):
+    """The team's next game on or after ``today``, if the schedule has been imported."""
+    today = (today or date.today()).isoformat()
+    try:
+        return await GameTeam.objects.filter(team=team, date__gte=today).order_by("date", "game_id").afirst()
+    except DatabaseError:
+        return None
+
+
+async def aresolve_matchups(player_name, today=None):
+    """``(last, upcoming)`` games for the player; either may be None."""
+    last = await alast_matchup(player_name)
+    upcoming = await aupcoming_matchup(last.team, today) if last else None
+    return last, upcoming
+
+
+def matchup_dict(game_team):
+    if game_team is None:
+        return None
+    return {
+        "game_id": game_team.game_id,
+        "team": game_team.team,
+        "opponent": game_team.opponent,
+        "home_away": game_team.home_away,
+        "week": game_team.week,
+        "date": game_team.date,
+    }
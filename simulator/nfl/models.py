@@ -50,3 +50,62 @@ class DefenseStats(models.Model):
 
     class Meta:
         db_table = "defense_stats"
+
+class DataVersion(models.Model):
+    id = models.IntegerField(primary_key=True)
+    version = models.IntegerField()
+    updated_at = models.CharField(max_length=32, null=True)
+
+    class Meta:
+        db_table = "data_version"
+
+class GameTeam(models.Model):
+    """One row per team per game, built by nfl_data_manager.py from the game's final score."""
+    id = models.IntegerField(primary_key=True)
+    game_id = models.IntegerField()
+    team = models.CharField(max_length=50)
+    opponent = models.CharField(max_length=50)
+    home_away = models.CharField(max_length=4)
+    week = models.IntegerField(null=True)
+    date = models.CharField(max_length=10, null=True)  # yyyy-mm-dd text, as stored by the importer
+
+    class Meta:
+        db_table = "game_teams"
+
+class PlayerCumulativeStats(models.Model):
+    """Running per-player totals, one row per game in date order (maintained by nfl_data_manager.py)."""
+    id = models.IntegerField(primary_key=True)
+    player = models.CharField(max_length=100)
+    team = models.CharField(max_length=50, null=True)
+    game_id = models.IntegerField()
+    season = models.IntegerField(null=True)
+    week = models.IntegerField(null=True)
+    date = models.CharField(max_length=10, null=True)
+    seq = models.IntegerField()
+    rush_attempts = models.FloatField()
+    rush_yards = models.FloatField()
+    rush_tds = models.FloatField()
+    receptions = models.FloatField()
+    rec_yards = models.FloatField()
+    rec_tds = models.FloatField()
+    targets = models.FloatField()
+    yards_after_catch = models.FloatField()
+
+    class Meta:
+        db_table = "player_cumulative_stats"
+
+class TeamCumulativeStats(models.Model):
+    """Running per-team defensive totals, one row per game in date order (maintained by nfl_data_manager.py)."""
+    id = models.IntegerField(primary_key=True)
+    team = models.CharField(max_length=50)
+    game_id = models.IntegerField()
+    season = models.IntegerField(null=True)
+    week = models.IntegerField(null=True)
+    date = models.CharField(max_length=10, null=True)
+    seq = models.IntegerField()
+    rush_yards_allowed = models.FloatField()
+    pass_yards_allowed = models.FloatField()
+    total_yards_allowed = models.FloatField()
+
+    class Meta:
+        db_table = "team_cumulative_stats"
@@ -0,0 +1,183 @@
+"""Opt-in per-request profiling for the NFL views.
+
+Enable with ``NFL_PROFILING = True`` in settings. ``RequestProfilingMiddleware``
+then records, for every request, the SQL query count and time, exact duplicate
+queries, and the time spent in named sections (``model`` for Ollama calls,
+``render`` for templates). The numbers go out in a ``Server-Timing`` header and
+the most recent profiles are kept in a ring buffer served at
+``/debug/profiles/`` (with DEBUG on, or to staff users).
+
+Code outside a request can use ``profile_request()`` directly; views mark
+sections with ``profile_section()``, which is a no-op when nothing is being
+profiled.
+"""
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_current_profile = ContextVar("nfl_request_profile", default=None)
+
+_recent_lock = threading.Lock()
+_recent_profiles = deque(maxlen=200)
+
+
+class RequestProfile:
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.total_time = None
+        self.queries = []
+        self.sections = defaultdict(float)
+
+    def record_query(self, sql, params, duration):
+        self.queries.append((sql, repr(params), duration))
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self._start
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def sql_time(self):
+        return sum(q[2] for q in self.queries)
+
+    @property
+    def duplicate_queries(self):
+        """Queries run more than once with identical SQL and params, with their counts."""
+        counts = Counter((sql, params) for sql, params, _ in self.queries)
+        return [
+            {"sql": sql, "params": params, "count": n}
+            for (sql, params), n in counts.most_common()
+            if n > 1
+        ]
+
+    def as_dict(self):
+        duplicates = self.duplicate_queries
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "total_ms": round((self.total_time or 0) * 1000, 2),
+            "query_count": self.query_count,
+            "sql_ms": round(self.sql_time * 1000, 2),
+            "duplicate_query_count": sum(d["count"] - 1 for d in duplicates),
+            "duplicate_queries": duplicates,
+            "sections_ms": {name: round(t * 1000, 2) for name, t in self.sections.items()},
+        }
+
+    def server_timing(self):
+        duplicates = sum(d["count"] - 1 for d in self.duplicate_queries)
+        parts = [f'db;dur={self.sql_time * 1000:.2f};desc="{self.query_count} queries, {duplicates} duplicate"']
+        for name, t in self.sections.items():
+            parts.append(f"{name};dur={t * 1000:.2f}")
+        if self.total_time is not None:
+            parts.append(f"total;dur={self.total_time * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, params, time.perf_counter() - start)
+
+
+def _install_query_wrapper(connection, **kwargs):
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+def enable_query_tracking():
+    """Hook every DB connection, including ones opened later in other threads.
+
+    The wrapper itself is cheap when no profile is active, and looking the
+    profile up through a ContextVar means queries run via ``sync_to_async``
+    are still attributed to the request that issued them.
+    """
+    connection_created.connect(_install_query_wrapper, dispatch_uid="nfl_profiling_query_wrapper")
+    for connection in connections.all(initialized_only=True):
+        _install_query_wrapper(connection)
+
+
+@contextmanager
+def profile_request(label):
+    profile = RequestProfile(label)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profile.finish()
+
+
+@contextmanager
+def profile_section(name):
+    """Add the time spent inside the block to ``name`` on the active profile, if any."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.sections[name] += time.perf_counter() - start
+
+
+def recent_profiles():
+    with _recent_lock:
+        return list(_recent_profiles)
+
+
+def _store_profile(profile):
+    with _recent_lock:
+        _recent_profiles.append(profile.as_dict())
+
+
+class RequestProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "NFL_PROFILING", False):
+            raise MiddlewareNotUsed
+        global _recent_profiles
+        size = getattr(settings, "NFL_PROFILING_BUFFER_SIZE", 200)
+        with _recent_lock:
+            _recent_profiles = deque(_recent_profiles, maxlen=size)
+        enable_query_tracking()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profile_request(f"{request.method} {request.path}") as profile:
+            response = self.get_response(request)
+        return self._finish(profile, response)
+
+    async def __acall__(self, request):
+        with profile_request(f"{request.method} {request.path}") as profile:
+            response = await self.get_response(request)
+        return self._finish(profile, response)
+
+    def _finish(self, profile, response):
+        response["Server-Timing"] = profile.server_timing()
+        response["X-Query-Count"] = str(profile.query_count)
+        _store_profile(profile)
+        return response
@@ -0,0 +1,169 @@
+"""Prompt building and response parsing for the single-game simulation.
+
+Structured mode (``NFL_SIMULATION_STRUCTURED``) hands Ollama a JSON schema via
+the ``format`` option, so the model can only emit a valid stat line, caps the
+generated tokens with ``num_predict`` and sends the stats payload in a compact
+encoding. With it off, the original free-form prompt and fence-stripping parse
+are used.
+
+``run_model`` talks to Ollama through an ``AsyncClient`` opened and closed per
+call, so pending simulations are just suspended coroutines;
+``NFL_SIMULATION_MAX_CONCURRENCY`` bounds how many are sent to the model at once
+across the whole process.
+"""
+import asyncio
+import json
+import threading
+
+import ollama
+from django.conf import settings
+
+STAT_KEYS = ["rush_attempts", "rush_yards", "rush_tds", "receptions", "receiving_yards", "receiving_tds"]
+
+SIMULATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **{key: {"type": "number"} for key in STAT_KEYS},
+        "notes": {"type": "string", "maxLength": 280},
+    },
+    "required": STAT_KEYS + ["notes"],
+    "additionalProperties": False,
+}
+
+FREE_FORM_INSTRUCTIONS = (
+    "Simulate a single NFL game and return a concise predicted stat line for the player. "
+    "Output JSON only with keys: rush_attempts, rush_yards, rush_tds, receptions, receiving_yards, receiving_tds, notes. "
+    "Keep numbers realistic and explain any assumptions in 'notes'."
+)
+
+# The schema already names the keys, so the structured instructions only carry intent.
+STRUCTURED_INSTRUCTIONS = (
+    "Predict this player's stat line for one game vs the opponent. "
+    "Realistic numbers; notes: one short sentence of assumptions."
+)
+
+
+def structured_mode():
+    return getattr(settings, "NFL_SIMULATION_STRUCTURED", True)
+
+
+def compact(value, places=1):
+    """Drop empty fields and round floats so the payload costs fewer prompt tokens."""
+    if isinstance(value, dict):
+        return {k: compact(v, places) for k, v in value.items() if v is not None and v != ""}
+    if isinstance(value, (list, tuple)):
+        return [compact(v, places) for v in value]
+    if isinstance(value, float):
+        rounded = round(value, places)
+        return int(rounded) if rounded.is_integer() else rounded
+    return value
+
+
+def recent_form(window):
+    """Per-game rates from an ``nfl.aggregates`` window, as sent to the model."""
+    if not window or not window["games"]:
+        return None
+    return {"games": window["games"], **window["per_game"]}
+
+
+def build_prompt(player_name, player_summary, opponent, defense_averages, structured=None,
+                 player_recent=None, opponent_recent=None):
+    if structured is None:
+        structured = structured_mode()
+    prompt = {
+        "player_name": player_name,
+        "player_summary": player_summary,
+        "player_recent_form": recent_form(player_recent),
+        "opponent": opponent,
+        "opponent_defense": defense_averages,
+        "opponent_recent_defense": recent_form(opponent_recent),
+    }
+    if not structured:
+        prompt["instructions"] = FREE_FORM_INSTRUCTIONS
+        return json.dumps(prompt, default=str)
+
+    # Per-game rates say the same thing as season totals in fewer tokens; the
+    # defense's season totals are redundant with its per-game numbers.
+    if defense_averages:
+        prompt["opponent_defense"] = {
+            k: defense_averages[k]
+            for k in ("games", "rush_yards_per_game", "pass_yards_per_game", "total_yards_per_game")
+            if k in defense_averages
+        }
+    prompt["task"] = STRUCTURED_INSTRUCTIONS
+    return json.dumps(compact(prompt), separators=(",", ":"), default=str)
+
+
+def chat_kwargs(prompt_text, structured=None):
+    """Keyword arguments for ``ollama.chat`` / ``AsyncClient.chat``."""
+    if structured is None:
+        structured = structured_mode()
+    kwargs = {
+        "model": getattr(settings, "NFL_SIMULATION_MODEL", "qwen3-coder:latest"),
+        "stream": False,
+        "messages": [{"role": "user", "content": prompt_text}],
+    }
+    if structured:
+        kwargs["format"] = SIMULATION_SCHEMA
+        kwargs["options"] = {
+            "num_predict": getattr(settings, "NFL_SIMULATION_NUM_PREDICT", 192),
+            "temperature": getattr(settings, "NFL_SIMULATION_TEMPERATURE", 0.4),
+        }
+    return kwargs
+
+
+def parse_simulation(model_text):
+    """Turn the model's reply into a dict with every stat key present and numeric where possible."""
+    clean = model_text.strip()
+    clean = clean.replace("```json", "").replace("```", "").strip()
+
+    try:
+        sim_result = json.loads(clean)
+    except Exception:
+        sim_result = None
+    if not isinstance(sim_result, dict):
+        sim_result = {"notes": "Could not parse JSON", "raw": clean}
+
+    # --- coerce numeric fields and ensure keys exist ---
+    for k in STAT_KEYS:
+        if k in sim_result:
+            try:
+                sim_result[k] = float(sim_result[k])
+            except Exception:
+                # leave as-is if not convertible
+                pass
+        else:
+            sim_result[k] = 0
+    return sim_result
+
+
+# Process-wide cap on requests in flight to Ollama. A threading semaphore
+# rather than an asyncio one: under WSGI every async view runs in its own
+# short-lived event loop, and nothing tied to one loop may outlive it.
+_model_slots = None
+_model_slots_lock = threading.Lock()
+_SLOT_POLL_SECONDS = 0.05
+
+
+def _slots():
+    global _model_slots
+    with _model_slots_lock:
+        if _model_slots is None:
+            _model_slots = threading.BoundedSemaphore(getattr(settings, "NFL_SIMULATION_MAX_CONCURRENCY", 16))
+        return _model_slots
+
+
+async def run_model(prompt_text, structured=None):
+    """Send one simulation prompt to Ollama without blocking the event loop."""
+    slots = _slots()
+    while not slots.acquire(blocking=False):
+        await asyncio.sleep(_SLOT_POLL_SECONDS)
+    try:
+        # One client per call, closed with the call, so no connection outlives the loop it was opened on.
+        async with ollama.AsyncClient(
+            host=getattr(settings, "OLLAMA_HOST", None),
+            timeout=getattr(settings, "NFL_SIMULATION_TIMEOUT", 300),
+        ) as client:
+            return await client.chat(**chat_kwargs(prompt_text, structured))
+    finally:
+        slots.release()
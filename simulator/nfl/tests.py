@@ -1,3 +1,217 @@
-from django.test import TestCase
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase
+
+from .aggregates import PLAYER_FIELDS, TEAM_FIELDS, aplayer_window, ateam_defense_window
+
+
+@contextmanager
+def quiet_importer(work_dir):
+    """The importer and generator modules, with the importer's per-file logging muted."""
+    # nfl_data_manager opens nfl_pipeline.log in the working directory when imported
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        import nfl_data_manager
+        import nfl_synthetic_data
+    finally:
+        os.chdir(cwd)
+
+    importer_logger = logging.getLogger("nfl_data_manager")
+    level = importer_logger.level
+    importer_logger.setLevel(logging.WARNING)
+    try:
+        yield nfl_data_manager, nfl_synthetic_data
+    finally:
+        importer_logger.setLevel(level)
+
+
+def build_stats_db(path, work_dir):
+    """Import two synthetic seasons (weeks 18-19 fall in January) with the real importer, in two passes."""
+    with quiet_importer(work_dir) as (manager, synthetic):
+        documents = list(synthetic.game_documents(2, 2, first_season=2024, weeks=19, variation_rate=0.2, seed=7))
+        db = manager.NFLStatsDatabase(path)
+        importer = manager.NFLStatsImporter(db)
+        # first pass builds the cumulative tables from scratch, the second rebuilds only touched names
+        importer.import_documents(documents[:200])
+        importer.import_documents(documents[200:])
+        db.conn.close()
+
+
+def direct_games(path, key_col, fields):
+    """Per-game totals straight from the raw stat tables: {name: [(date, game_id, week, {field: value})]}."""
+    sources = {
+        "player": {
+            "rushing_stats": {"rush_attempts": "attempts", "rush_yards": "yards", "rush_tds": "touchdowns"},
+            "receiving_stats": {"receptions": "receptions", "rec_yards": "yards", "rec_tds": "touchdowns",
+                                "targets": "targets", "yards_after_catch": "yards_after_catch"},
+        },
+        "team": {
+            "defense_stats": {f: f for f in TEAM_FIELDS},
+        },
+    }[key_col]
+    per_game = defaultdict(lambda: {f: 0.0 for f in fields})
+    meta = {}
+    conn = sqlite3.connect(path)
+    try:
+        for table, columns in sources.items():
+            present = {row[1] for row in conn.execute(f"PRAGMA table_info([{table}])")}
+            select = ", ".join(f"[{c}]" if c in present else "NULL" for c in columns.values())
+            for row in conn.execute(f"SELECT s.[{key_col}], s.game_id, g.date, g.week, {select} "
+                                    f"FROM [{table}] s JOIN games g ON g.id = s.game_id"):
+                name, game_id, game_date, week, values = row[0], row[1], row[2], row[3], row[4:]
+                for field, value in zip(columns, values):
+                    per_game[name, game_id][field] += float(value or 0)
+                meta[name, game_id] = (game_date, week)
+    finally:
+        conn.close()
+
+    games = defaultdict(list)
+    for (name, game_id), totals in per_game.items():
+        game_date, week = meta[name, game_id]
+        games[name].append((game_date, game_id, week, totals))
+    for rows in games.values():
+        rows.sort(key=lambda r: (r[0], r[1]))
+    return games
+
+
+def season_of(game_date):
+    d = date.fromisoformat(game_date)
+    return d.year - (d.month < 3)
+
+
+def summed(rows, fields):
+    return {f: sum(r[3][f] for r in rows) for f in fields}
+
+
+class WindowAggregateTests(SimpleTestCase):
+    databases = {"default"}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.work_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.work_dir, "stats.db")
+        build_stats_db(cls.db_path, cls.work_dir)
+        cls.player_games = direct_games(cls.db_path, "player", PLAYER_FIELDS)
+        cls.team_games = direct_games(cls.db_path, "team", TEAM_FIELDS)
+        # The test database has none of the importer's tables, so unqualified
+        # names resolve to the attached stats database.
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute("ATTACH DATABASE %s AS stats", [cls.db_path])
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.cursor() as cursor:
+            cursor.execute("DETACH DATABASE stats")
+        shutil.rmtree(cls.work_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def assertWindow(self, window, rows, fields):
+        self.assertIsNotNone(window)
+        self.assertEqual(window["games"], len(rows))
+        self.assertEqual(window["through_date"], rows[-1][0])
+        expected = summed(rows, fields)
+        for f in fields:
+            self.assertAlmostEqual(window["totals"][f], expected[f], places=6, msg=f)
+            self.assertAlmostEqual(window["per_game"][f], round(expected[f] / len(rows), 2), places=6, msg=f)
+
+    def players(self):
+        return ["Bills Back 1", "Chiefs Back 2", "49ers Back 1"]
+
+    def test_fixture_straddles_new_year(self):
+        dates = [r[0] for r in self.player_games["Bills Back 1"]]
+        self.assertTrue(any(d.startswith("2025-01") for d in dates))
+        self.assertTrue(any(d.startswith("2026-01") for d in dates))
+
+    async def test_player_last_n(self):
+        for player in self.players():
+            rows = self.player_games[player]
+            for n in (1, 4, len(rows) - 1, len(rows), len(rows) + 5):
+                with self.subTest(player=player, n=n):
+                    self.assertWindow(await aplayer_window(player, last_n=n), rows[-n:], PLAYER_FIELDS)
+
+    async def test_player_whole_season_includes_january_games(self):
+        for player in self.players():
+            for season in (2024, 2025):
+                with self.subTest(player=player, season=season):
+                    rows = [r for r in self.player_games[player] if season_of(r[0]) == season]
+                    window = await aplayer_window(player, season=season)
+                    self.assertWindow(window, rows, PLAYER_FIELDS)
+                    self.assertTrue(window["through_date"].startswith(f"{season + 1}-01"))
+                    self.assertEqual(window["through_week"], 19)
+
+    async def test_player_through_week(self):
+        for player in self.players():
+            for season, week in ((2024, 1), (2024, 8), (2024, 18), (2025, 12)):
+                with self.subTest(player=player, season=season, week=week):
+                    rows = [r for r in self.player_games[player] if season_of(r[0]) == season and r[2] <= week]
+                    self.assertWindow(await aplayer_window(player, season=season, through_week=week), rows,
+                                      PLAYER_FIELDS)
+
+    async def test_player_last_n_through_week_reaches_into_previous_season(self):
+        player = "Bills Back 1"
+        all_rows = self.player_games[player]
+        end = max(i for i, r in enumerate(all_rows) if season_of(r[0]) == 2025 and r[2] <= 2)
+        window = await aplayer_window(player, season=2025, through_week=2, last_n=4)
+        self.assertWindow(window, all_rows[end - 3:end + 1], PLAYER_FIELDS)
+
+    async def test_team_defense_windows(self):
+        for team in ("Buffalo Bills", "Miami Dolphins"):
+            rows = self.team_games[team]
+            with self.subTest(team=team, window="last 4"):
+                self.assertWindow(await ateam_defense_window(team, last_n=4), rows[-4:], TEAM_FIELDS)
+            with self.subTest(team=team, window="2024"):
+                season_rows = [r for r in rows if season_of(r[0]) == 2024]
+                self.assertWindow(await ateam_defense_window(team, season=2024), season_rows, TEAM_FIELDS)
+            with self.subTest(team=team, window="2025 through week 6"):
+                week_rows = [r for r in rows if season_of(r[0]) == 2025 and r[2] <= 6]
+                self.assertWindow(await ateam_defense_window(team, season=2025, through_week=6), week_rows,
+                                  TEAM_FIELDS)
+
+    async def test_unknown_names_and_seasons(self):
+        self.assertIsNone(await aplayer_window("Nobody At All", last_n=4))
+        self.assertIsNone(await aplayer_window("Bills Back 1", season=2019))
+        self.assertIsNone(await ateam_defense_window("London Monarchs", season=2024))
+
+
+class CumulativeBackfillTests(SimpleTestCase):
+    def test_tables_are_backfilled_independently(self):
+        with tempfile.TemporaryDirectory() as work_dir, quiet_importer(work_dir) as (manager, synthetic):
+            documents = list(synthetic.game_documents(1, 2, weeks=3))
+            for _, data in documents:
+                for block in data["game_info"]["teams"].values():
+                    del block["defense"]
+            db = manager.NFLStatsDatabase(os.path.join(work_dir, "stats.db"))
+            importer = manager.NFLStatsImporter(db)
+            importer.import_documents(documents[:32])
+            self.assertFalse(db.cumulative_needs_backfill("player_cumulative_stats"))
+            # no defense rows, so an empty team table is not a reason to rebuild anything
+            self.assertFalse(db.cumulative_needs_backfill("team_cumulative_stats"))
+
+            def row_ids():
+                return dict(db.conn.execute(
+                    "SELECT player, group_concat(id) FROM player_cumulative_stats GROUP BY player"))
+
+            before = row_ids()
+            game = documents[32][1]["game_info"]
+            touched = {row["player"] for block in game["teams"].values() for row in block["rushing"]}
+            importer.import_documents(documents[32:33])
+            after = row_ids()
+            db.conn.close()
+
+        self.assertEqual(len(touched), 4)
+        for player, ids in before.items():
+            if player in touched:
+                self.assertNotEqual(after[player], ids, player)
+            else:
+                self.assertEqual(after[player], ids, player)
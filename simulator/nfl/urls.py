@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import nfl_home, running_backs, running_back_detail, run_simulation
+from .views import nfl_home, running_backs, running_back_detail, run_simulation, debug_profiles
 
 urlpatterns = [
     path("", nfl_home, name="nfl_home"),   # homepage
     path("running_backs/", running_backs, name="running_backs"),
     path("running_backs/<str:player_name>/", running_back_detail, name="running_back_detail"),
     path("running_backs/<str:player_name>/simulate/", run_simulation, name="run_simulation"),
+    path("debug/profiles/", debug_profiles, name="debug_profiles"),
 ]
@@ -1,10 +1,20 @@
+from datetime import date
 from urllib.parse import unquote
 import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 import json
-import ollama
+from .aggregates import aplayer_window, ateam_defense_window
+from .caching import aget_data_version, aget_or_compute, get_or_compute, versioned_key
+from .matchups import aresolve_matchups, matchup_dict
 from .models import RushingStats, ReceivingStats, DefenseStats
+from .profiling import profile_section, recent_profiles
+from .simulation import build_prompt, parse_simulation, run_model
 
 # 32 NFL teams used for the simulation dropdown
 NFL_TEAMS = [
@@ -18,111 +28,143 @@ NFL_TEAMS = [
     "Seattle Seahawks","Tampa Bay Buccaneers","Tennessee Titans","Washington Commanders",
 ]
 
-def infer_opponent_team_from_last_row(rush_qs):
-    if not rush_qs.exists():
-        return None
-    last_row = rush_qs.order_by("-id").first()
-
-    # If DefenseStats has rows for last_row.team, assume that is the defense team
-    if last_row.team and DefenseStats.objects.filter(team__iexact=last_row.team).exists():
-        return last_row.team
-
-    # If there is a game_id on the rushing row and DefenseStats uses game_id, try that
-    game_id = getattr(last_row, "game_id", None)
-    if game_id is not None:
-        ds = DefenseStats.objects.filter(game_id=game_id).first()
-        if ds:
-            return ds.team
-
-    # Fallback: try to find a defense row that contains the team string
-    if last_row.team:
-        ds = DefenseStats.objects.filter(team__icontains=last_row.team).first()
-        if ds:
-            return ds.team
-
-    return None
-
 def nfl_home(request):
     return render(request, "nfl_home.html")
 
 def running_backs(request):
-    # Get unique player names from rushing stats
-    players = (
-        RushingStats.objects
-        .exclude(player__isnull=True)
-        .exclude(player__exact='')
-        .values_list("player", flat=True)
-        .distinct()
-        .order_by("player")
-    )
+    # The list has no per-user content, so the whole rendered page is cached per data version
+    def build_page():
+        # Get unique player names from rushing stats
+        players = (
+            RushingStats.objects
+            .exclude(player__isnull=True)
+            .exclude(player__exact='')
+            .values_list("player", flat=True)
+            .distinct()
+            .order_by("player")
+        )
+        with profile_section("render"):
+            return render_to_string("running_backs.html", {"players": players}, request)
 
-    return render(request, "running_backs.html", {"players": players})
+    html = get_or_compute(versioned_key("running_backs_page"), build_page)
+    return HttpResponse(html)
 
 
-def running_back_detail(request, player_name):
-    # Rushing aggregates
+async def running_back_detail(request, player_name):
     player_name = unquote(player_name).strip()
+    # The page carries a per-user CSRF token, so cache the aggregates and render fresh
+    version = await aget_data_version()
+    today = date.today()
+    # Keyed by day as well, since "upcoming game" moves with the calendar
+    player_stats = await aget_or_compute(
+        versioned_key("running_back_stats", player_name, today, version=version),
+        lambda: build_running_back_stats(player_name, version, today),
+    )
+    context = {
+        "player_stats": player_stats,
+        "teams_list": NFL_TEAMS,
+    }
+    with profile_section("render"):
+        return await sync_to_async(render)(request, "running_back_detail.html", context)
+
+
+async def aggregate_player_stats(rush_qs, rec_qs):
+    """Season totals for a player in two aggregate queries instead of iterating every row."""
+    rush = await rush_qs.aaggregate(
+        games=Count("id"),
+        attempts=Sum("attempts"),
+        yards=Sum("yards"),
+        touchdowns=Sum("touchdowns"),
+        long=Max("long"),
+    )
+    rec = await rec_qs.aaggregate(
+        games=Count("id"),
+        receptions=Sum("receptions"),
+        yards=Sum("yards"),
+        touchdowns=Sum("touchdowns"),
+        targets=Sum("targets"),
+        yards_after_catch=Sum("yards_after_catch"),
+    )
+    # Sum() is NULL over no rows; the templates expect zeros
+    for totals in (rush, rec):
+        for key, value in totals.items():
+            if value is None and key != "long":
+                totals[key] = 0
+    return rush, rec
+
+
+async def build_running_back_stats(player_name, version=None, today=None):
     rush_qs = RushingStats.objects.filter(player=player_name)
-    rush_games = rush_qs.count()
-    rush_attempts = sum((r.attempts or 0) for r in rush_qs)
-    rush_yards = sum((r.yards or 0) for r in rush_qs)
-    rush_tds = sum((r.touchdowns or 0) for r in rush_qs)
-    rush_long = max((r.long or 0) for r in rush_qs) if rush_qs.exists() else None
+    rec_qs = ReceivingStats.objects.filter(player=player_name)
+    rush, rec = await aggregate_player_stats(rush_qs, rec_qs)
+
+    # Rushing aggregates
+    rush_games = rush["games"]
+    rush_yards = rush["yards"]
     rush_avg_per_game = (rush_yards / rush_games) if rush_games else 0
-    rush_yards_per_attempt = (rush_yards / rush_attempts) if rush_attempts else 0
+    rush_yards_per_attempt = (rush_yards / rush["attempts"]) if rush["attempts"] else 0
 
     # Receiving aggregates
-    rec_qs = ReceivingStats.objects.filter(player=player_name)
-    rec_games = rec_qs.count()
-    receptions = sum((r.receptions or 0) for r in rec_qs)
-    rec_yards = sum((r.yards or 0) for r in rec_qs)
-    rec_tds = sum((r.touchdowns or 0) for r in rec_qs)
-    rec_targets = sum((r.targets or 0) for r in rec_qs)
-    rec_yac = sum((r.yards_after_catch or 0) for r in rec_qs)
-    rec_yards_per_rec = (rec_yards / receptions) if receptions else 0
-    # Opponent defense averages (if we can infer opponent team from last game row)
-    opponent_team = None
-
-    if rush_qs.exists():
-        last_row = rush_qs.order_by("-id").first()
-        opponent_team = getattr(last_row, "team", None)
-
-    defense_averages = get_defense_averages(opponent_team) if opponent_team else None
-
-    player_stats = {
+    receptions = rec["receptions"]
+    rec_yards_per_rec = (rec["yards"] / receptions) if receptions else 0
+
+    # Opponent defense averages for the team the player faced in their last game
+    last_game, upcoming_game = await aresolve_matchups(player_name, today)
+    opponent_team = last_game.opponent if last_game else None
+
+    defense_averages = await aget_defense_averages(opponent_team, version) if opponent_team else None
+    recent = await aplayer_window(player_name, last_n=recent_form_games())
+
+    return {
         "player_name": player_name,
         "rush_games": rush_games,
-        "rush_attempts": rush_attempts,
+        "rush_attempts": rush["attempts"],
         "rush_yards": rush_yards,
-        "rush_touchdowns": rush_tds,
-        "rush_long": rush_long,
+        "rush_touchdowns": rush["touchdowns"],
+        "rush_long": rush["long"] if rush_games else None,
         "rush_yards_per_game": round(rush_avg_per_game, 2),
         "rush_yards_per_attempt": round(rush_yards_per_attempt, 2),
-        "rec_games": rec_games,
+        "rec_games": rec["games"],
         "receptions": receptions,
-        "receiving_yards": rec_yards,
-        "receiving_touchdowns": rec_tds,
-        "targets": rec_targets,
+        "receiving_yards": rec["yards"],
+        "receiving_touchdowns": rec["touchdowns"],
+        "targets": rec["targets"],
         "receiving_yards_per_reception": round(rec_yards_per_rec, 2),
-        "receiving_yac": rec_yac,
+        "receiving_yac": rec["yards_after_catch"],
         "defense_averages": defense_averages,
+        "last_game": matchup_dict(last_game),
+        "upcoming_game": matchup_dict(upcoming_game),
+        "recent_form": recent,
     }
-    context = {
-        "player_stats": player_stats,
-        "teams_list": NFL_TEAMS,
-    }
-    return render(request, "running_back_detail.html", context)
 
 
-def get_defense_averages(team_name):
-    rows = DefenseStats.objects.filter(team=team_name)
-    if not rows.exists():
+def recent_form_games():
+    return getattr(settings, "NFL_RECENT_FORM_GAMES", 4)
+
+
+async def aget_defense_averages(team_name, version=None):
+    if version is None:
+        version = await aget_data_version()
+    return await aget_or_compute(
+        versioned_key("defense_averages", team_name, version=version),
+        lambda: compute_defense_averages(team_name),
+    )
+
+
+async def compute_defense_averages(team_name):
+    totals = await DefenseStats.objects.filter(team=team_name).aaggregate(
+        games=Count("id"),
+        rush_allowed=Sum("rush_yards_allowed"),
+        pass_allowed=Sum("pass_yards_allowed"),
+        total_allowed=Sum("total_yards_allowed"),
+    )
+    games = totals["games"]
+    if not games:
         return None
 
-    games = rows.count()
-    rush_allowed = sum(r.rush_yards_allowed for r in rows)
-    pass_allowed = sum(r.pass_yards_allowed for r in rows)
-    total_allowed = sum(r.total_yards_allowed for r in rows)
+    rush_allowed = totals["rush_allowed"] or 0
+    pass_allowed = totals["pass_allowed"] or 0
+    total_allowed = totals["total_allowed"] or 0
 
     return {
         "team": team_name,
@@ -138,82 +180,66 @@ def get_defense_averages(team_name):
 def normalize_player_name(raw):
     return unquote(raw).strip()
 
+async def aresolve_player_name(player_name):
+    """The ``player`` value as stored for the first matching rushing/receiving row.
+
+    Tries a case-insensitive match before a substring match; returns the name
+    unchanged when nothing matches.
+    """
+    for lookup in ("player__iexact", "player__icontains"):
+        for model in (RushingStats, ReceivingStats):
+            stored = await model.objects.filter(**{lookup: player_name}).values_list("player", flat=True).afirst()
+            if stored:
+                return stored
+    return player_name
+
 @require_POST
-def run_simulation(request, player_name):
-    player_name = normalize_player_name(player_name)
+async def run_simulation(request, player_name):
+    # The stored spelling, so the totals, matchup and recent-form lookups all find the same player
+    player_name = await aresolve_player_name(normalize_player_name(player_name))
 
     # Get selected opponent from form
     opponent = request.POST.get("opponent_team", "").strip()
     if not opponent:
-        # fallback: try to infer opponent from last rush row
-        rush_qs = RushingStats.objects.filter(player__iexact=player_name)
-        opponent = infer_opponent_team_from_last_row(rush_qs) or ""
+        # fallback: the player's next scheduled opponent, else the one from their last game
+        last_game, upcoming_game = await aresolve_matchups(player_name)
+        game = upcoming_game or last_game
+        opponent = game.opponent if game else ""
 
     # Gather player season aggregates (same logic as detail view)
-    rush_qs = RushingStats.objects.filter(player__iexact=player_name)
-    rec_qs = ReceivingStats.objects.filter(player__iexact=player_name)
-
-    # fallback to icontains if exact match fails
-    if not rush_qs.exists() and not rec_qs.exists():
-        rush_qs = RushingStats.objects.filter(player__icontains=player_name)
-        rec_qs = ReceivingStats.objects.filter(player__icontains=player_name)
+    rush_qs = RushingStats.objects.filter(player=player_name)
+    rec_qs = ReceivingStats.objects.filter(player=player_name)
 
     # compute aggregates
-    rush_games = rush_qs.count()
-    rush_attempts = sum((r.attempts or 0) for r in rush_qs)
-    rush_yards = sum((r.yards or 0) for r in rush_qs)
-    rush_tds = sum((r.touchdowns or 0) for r in rush_qs)
-
-    receptions = sum((r.receptions or 0) for r in rec_qs)
-    rec_yards = sum((r.yards or 0) for r in rec_qs)
-    rec_tds = sum((r.touchdowns or 0) for r in rec_qs)
+    rush, rec = await aggregate_player_stats(rush_qs, rec_qs)
 
     # defense season averages for the chosen opponent (if available)
-    defense_averages = get_defense_averages(opponent) if opponent else None
+    defense_averages = await aget_defense_averages(opponent) if opponent else None
+
+    # recent form on both sides of the matchup, two row lookups each
+    player_recent = await aplayer_window(player_name, last_n=recent_form_games())
+    opponent_recent = await ateam_defense_window(opponent, last_n=recent_form_games()) if opponent else None
 
     # Build a compact prompt for the Ollama model
-    prompt = {
-        "player_name": player_name,
-        "player_summary": {
-            "rush_games": rush_games,
-            "rush_attempts": rush_attempts,
-            "rush_yards": rush_yards,
-            "rush_tds": rush_tds,
-            "receptions": receptions,
-            "rec_yards": rec_yards,
-            "rec_tds": rec_tds,
-        },
-        "opponent": opponent,
-        "opponent_defense": defense_averages,
-        "instructions": (
-            "Simulate a single NFL game and return a concise predicted stat line for the player. "
-            "Output JSON only with keys: rush_attempts, rush_yards, rush_tds, receptions, receiving_yards, receiving_tds, notes. "
-            "Keep numbers realistic and explain any assumptions in 'notes'."
-        )
+    player_summary = {
+        "rush_games": rush["games"],
+        "rush_attempts": rush["attempts"],
+        "rush_yards": rush["yards"],
+        "rush_tds": rush["touchdowns"],
+        "receptions": rec["receptions"],
+        "rec_yards": rec["yards"],
+        "rec_tds": rec["touchdowns"],
     }
-    prompt_text = json.dumps(prompt, default=str)
+    prompt_text = build_prompt(player_name, player_summary, opponent, defense_averages,
+                               player_recent=player_recent, opponent_recent=opponent_recent)
     start_time = time.time()
 
     try:
-
-        resp = ollama.chat(
-            # model = "glm-4.7-flash:latest",  # Works well, 169 seconds response
-            # model = "gemma3:1b", # No json, but had notes.  8.5 seconds response
-            # model = "deepseek-r1:1.5b",  # Way off in the numbers, 15 second response
-            model = "qwen3-coder:latest",  # Works well and only 22.5 second response
-            # model = "llava:7b",  #  No json and no notes.  43 second response
-            # model = "llama3.3:latest",  # Works well, 385 second response
-            stream = False,
-            messages=[
-                {
-                    'role': 'user',
-                    'content': prompt_text
-                }
-            ]
-        )
+        with profile_section("model"):
+            resp = await run_model(prompt_text)
 
     except Exception as e:
-        return render(request, "simulation_error.html", {"error": str(e), "player_name": player_name})
+        return await sync_to_async(render)(request, "simulation_error.html", {"error": str(e), "player_name": player_name})
 
     end_time = time.time()
     print(f"The time it took in querying the model was {end_time-start_time}")
@@ -221,24 +247,7 @@ def run_simulation(request, player_name):
     # --- extract model text from the non-streaming response ---
     # The client may return a dict-like object or an object with attributes.
     model_text = resp["message"]["content"]
-    clean = model_text.strip()
-    clean = clean.replace("```json", "").replace("```", "").strip()
-
-    try:
-        sim_result = json.loads(clean)
-    except Exception:
-        sim_result = {"notes": "Could not parse JSON", "raw": clean}
-
-    # --- coerce numeric fields and ensure keys exist ---
-    for k in ["rush_attempts", "rush_yards", "rush_tds", "receptions", "receiving_yards", "receiving_tds"]:
-        if k in sim_result:
-            try:
-                sim_result[k] = float(sim_result[k])
-            except Exception:
-                # leave as-is if not convertible
-                pass
-        else:
-            sim_result[k] = 0
+    sim_result = parse_simulation(model_text)
 
     # --- render results and include raw_model_text for debugging ---
     context = {
@@ -249,4 +258,19 @@ def run_simulation(request, player_name):
         "raw_model_text": model_text,
         "extracted_json": json.dumps(sim_result, indent=2),
     }
-    return render(request, "simulation_result.html", context)
+    with profile_section("render"):
+        return await sync_to_async(render)(request, "simulation_result.html", context)
+
+
+def debug_profiles(request):
+    """Recent request profiles from the profiling middleware's ring buffer.
+
+    The profiles carry every visitor's SQL and parameters, so outside DEBUG
+    only staff users may read them.
+    """
+    if not getattr(settings, "NFL_PROFILING", False):
+        raise Http404("Profiling is disabled")
+    user = getattr(request, "user", None)
+    if not settings.DEBUG and not (user and user.is_active and user.is_staff):
+        raise Http404("Profiling is disabled")
+    return JsonResponse({"profiles": recent_profiles()})
@@ -2,11 +2,15 @@
 # File Name: nfl_data_manager.property
 # OPP version of batch_json_to_sql.py
 # Usage: python nfl_data_manager.py ./NFL_2025_week_1 --db Week1_Stats.db (if you want to overwrite the default db name.)
+# Note: the Django site reads the same SQLite file while this runs. Both sides use WAL journaling, the schema is
+#       migrated once up front and rows are committed in bounded chunks of files (--chunk-size), so page reads
+#       never wait on a long import transaction.
 
 import sqlite3
 import json
 import logging
 import argparse
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 
@@ -18,14 +22,82 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Keep in step with DATABASES['default']['OPTIONS']['init_command'] in simulator/settings.py
+SQLITE_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),     # safe with WAL; fsync only at checkpoints
+    ("cache_size", -64000),        # negative = KiB, so ~64 MB of page cache
+    ("mmap_size", 268435456),      # 256 MB memory-mapped reads
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 30000),       # wait up to 30s for a lock instead of failing
+)
+
+DEFAULT_CHUNK_SIZE = 50
+
+# Running totals kept per player and per team, one row per game in date order, so any
+# window ("last 4 games", "through week N") is the difference of two rows.
+# cumulative column -> {source stats table: source column}
+PLAYER_CUMULATIVE_FIELDS = {
+    "rush_attempts": ("rushing_stats", "attempts"),
+    "rush_yards": ("rushing_stats", "yards"),
+    "rush_tds": ("rushing_stats", "touchdowns"),
+    "receptions": ("receiving_stats", "receptions"),
+    "rec_yards": ("receiving_stats", "yards"),
+    "rec_tds": ("receiving_stats", "touchdowns"),
+    "targets": ("receiving_stats", "targets"),
+    "yards_after_catch": ("receiving_stats", "yards_after_catch"),
+}
+TEAM_CUMULATIVE_FIELDS = {
+    "rush_yards_allowed": ("defense_stats", "rush_yards_allowed"),
+    "pass_yards_allowed": ("defense_stats", "pass_yards_allowed"),
+    "total_yards_allowed": ("defense_stats", "total_yards_allowed"),
+}
+CUMULATIVE_CHUNK_SIZE = 250
+# Rows in the player tables that are not a real player
+NON_PLAYER_NAMES = ("", "Team", "Team Total")
+
 class NFLStatsDatabase:
     def __init__(self, db_path):
-        self.conn = sqlite3.connect(db_path)
+        # Autocommit at the driver level; transactions are opened explicitly with transaction()/savepoint()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
         self.conn.row_factory = sqlite3.Row
+        self._columns = {}
+        self._apply_pragmas()
         self._create_tables()
 
+    def _apply_pragmas(self):
+        for name, value in SQLITE_PRAGMAS:
+            self.conn.execute(f"PRAGMA {name}={value}")
+
+    @contextmanager
+    def transaction(self):
+        """One write transaction. IMMEDIATE takes the write lock up front so it never has to upgrade mid-way."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            self._columns.clear()  # any DDL in the transaction was undone too
+            raise
+        else:
+            self.conn.execute("COMMIT")
+
+    @contextmanager
+    def savepoint(self, name="sp"):
+        """Nested unit inside transaction(); on error only its own writes are undone."""
+        self.conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute(f"ROLLBACK TO {name}")
+            self.conn.execute(f"RELEASE {name}")
+            self._columns.clear()
+            raise
+        else:
+            self.conn.execute(f"RELEASE {name}")
+
     def _create_tables(self):
-        with self.conn:
+        with self.transaction():
             self.conn.execute("""
                 CREATE TABLE IF NOT EXISTS games (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -36,20 +108,204 @@ class NFLStatsDatabase:
                     UNIQUE(matchup, date)
                 )
             """)
+            # Single-row stamp the Django views fold into their cache keys.
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS data_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL,
+                    updated_at TEXT
+                )
+            """)
+            self.conn.execute("INSERT OR IGNORE INTO data_version (id, version, updated_at) VALUES (1, 0, NULL)")
+            # One row per team per game, so opponent and last/upcoming-game lookups are a single index probe.
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS game_teams (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    game_id INTEGER NOT NULL,
+                    team TEXT NOT NULL,
+                    opponent TEXT NOT NULL,
+                    home_away TEXT NOT NULL CHECK (home_away IN ('home', 'away')),
+                    week INTEGER,
+                    date TEXT,
+                    UNIQUE(game_id, team)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_game_teams_team_date ON game_teams (team, date)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_game_teams_date ON game_teams (date)")
+            self._create_cumulative_table("player_cumulative_stats", "player", PLAYER_CUMULATIVE_FIELDS, "team TEXT,")
+            self._create_cumulative_table("team_cumulative_stats", "team", TEAM_CUMULATIVE_FIELDS)
+
+    def _create_cumulative_table(self, table_name, key_col, fields, extra_cols=""):
+        totals = ", ".join(f"{f} REAL NOT NULL DEFAULT 0" for f in fields)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {key_col} TEXT NOT NULL,
+                {extra_cols}
+                game_id INTEGER NOT NULL,
+                season INTEGER,
+                week INTEGER,
+                date TEXT,
+                seq INTEGER NOT NULL,
+                {totals},
+                UNIQUE({key_col}, seq)
+            )
+        """)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_season_week ON {table_name} ({key_col}, season, week)")
+
+    def bump_data_version(self):
+        """Marks the stats as changed so every cached page/aggregate keyed on the old version goes stale."""
+        with self.transaction():
+            self.conn.execute("UPDATE data_version SET version = version + 1, updated_at = ? WHERE id = 1",
+                              (datetime.now().isoformat(timespec="seconds"),))
+        row = self.conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def stats_table_name(category):
+        return f"{category.lower().replace(' ', '_')}_stats"
+
+    def _table_columns(self, table_name):
+        if table_name not in self._columns:
+            rows = self.conn.execute(f"PRAGMA table_info([{table_name}])").fetchall()
+            self._columns[table_name] = {row[1] for row in rows}
+        return self._columns[table_name]
 
     def _ensure_columns(self, table_name, keys):
-        """Checks if columns exist and adds them if they don't."""
-        cursor = self.conn.cursor()
-        cursor.execute(f"PRAGMA table_info([{table_name}])")
-        existing_cols = [row[1] for row in cursor.fetchall()]
+        """Creates the table if needed and adds any missing columns. Runs inside the caller's transaction."""
+        existing_cols = self._table_columns(table_name)
+        if not existing_cols:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS [{table_name}] (id INTEGER PRIMARY KEY AUTOINCREMENT, game_id INTEGER, team TEXT, player TEXT)")
+            existing_cols.update(("id", "game_id", "team", "player"))
 
         for key in keys:
             if key not in existing_cols and key != 'player':
                 try:
-                    cursor.execute(f"ALTER TABLE [{table_name}] ADD COLUMN [{key}] REAL")
+                    self.conn.execute(f"ALTER TABLE [{table_name}] ADD COLUMN [{key}] REAL")
                     logger.info(f"Added new column [{key}] to table [{table_name}]")
                 except sqlite3.OperationalError:
                     pass # Column might have been added by another process
+                existing_cols.add(key)
+
+    def migrate_schema(self, table_columns):
+        """Applies every CREATE/ALTER for an import in a single short transaction before any rows are written."""
+        with self.transaction():
+            for table_name, keys in table_columns.items():
+                self._ensure_columns(table_name, keys)
+
+    def index_player_tables(self):
+        """Indexes the player stat tables on (player, game_id, team) for the views' per-player game lookups."""
+        with self.transaction():
+            for table_name in ("rushing_stats", "receiving_stats"):
+                if self._table_columns(table_name):
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS [idx_{table_name}_player_game] ON [{table_name}] (player, game_id, team)")
+
+    def backfill_game_teams(self):
+        """Fills game_teams for games imported before the table existed, from the "away vs home" matchup text."""
+        with self.transaction():
+            self.conn.execute("""
+                INSERT OR IGNORE INTO game_teams (game_id, team, opponent, home_away, week, date)
+                SELECT id, substr(matchup, 1, instr(matchup, ' vs ') - 1), substr(matchup, instr(matchup, ' vs ') + 4), 'away', week, date
+                FROM games WHERE instr(matchup, ' vs ') > 0
+                UNION ALL
+                SELECT id, substr(matchup, instr(matchup, ' vs ') + 4), substr(matchup, 1, instr(matchup, ' vs ') - 1), 'home', week, date
+                FROM games WHERE instr(matchup, ' vs ') > 0
+            """)
+
+    def cumulative_needs_backfill(self, target):
+        """True when one cumulative table is empty but its source tables have rows (first run after upgrading)."""
+        key_col, fields, excluded = {
+            "player_cumulative_stats": ("player", PLAYER_CUMULATIVE_FIELDS, NON_PLAYER_NAMES),
+            "team_cumulative_stats": ("team", TEAM_CUMULATIVE_FIELDS, ()),
+        }[target]
+        if self.conn.execute(f"SELECT 1 FROM {target} LIMIT 1").fetchone() is not None:
+            return False
+        placeholders = ", ".join("?" for _ in excluded)
+        for table_name in dict.fromkeys(table for table, _ in fields.values()):
+            if not self._table_columns(table_name):
+                continue
+            sql = f"SELECT 1 FROM [{table_name}] WHERE [{key_col}] IS NOT NULL"
+            if excluded:
+                sql += f" AND [{key_col}] NOT IN ({placeholders})"
+            if self.conn.execute(sql + " LIMIT 1", excluded).fetchone() is not None:
+                return True
+        return False
+
+    def rebuild_player_cumulative(self, players=None):
+        """Recomputes running totals for the given players (all players if None)."""
+        if players is None:
+            players = self._distinct_names({table for table, _ in PLAYER_CUMULATIVE_FIELDS.values()}, "player")
+        players = sorted(p for p in players if p not in NON_PLAYER_NAMES)
+        self._rebuild_cumulative("player_cumulative_stats", "player", PLAYER_CUMULATIVE_FIELDS, players)
+
+    def rebuild_team_cumulative(self, teams=None):
+        """Recomputes running defensive totals for the given teams (all teams if None)."""
+        if teams is None:
+            teams = self._distinct_names({table for table, _ in TEAM_CUMULATIVE_FIELDS.values()}, "team")
+        self._rebuild_cumulative("team_cumulative_stats", "team", TEAM_CUMULATIVE_FIELDS, sorted(teams))
+
+    def _distinct_names(self, tables, col):
+        names = set()
+        for table_name in tables:
+            if self._table_columns(table_name):
+                names.update(row[0] for row in self.conn.execute(f"SELECT DISTINCT [{col}] FROM [{table_name}]"))
+        names.discard(None)
+        return names
+
+    def _rebuild_cumulative(self, target, key_col, fields, names):
+        # One UNION ALL branch per source table, zero-filling the fields it does not carry
+        branches = []
+        for table_name in dict.fromkeys(table for table, _ in fields.values()):
+            cols = self._table_columns(table_name)
+            if not cols:
+                continue
+            exprs = []
+            for field, (source_table, source_col) in fields.items():
+                if source_table == table_name and source_col in cols:
+                    exprs.append(f"COALESCE([{source_col}], 0) AS {field}")
+                else:
+                    exprs.append(f"0 AS {field}")
+            branches.append(
+                f"SELECT [{key_col}] AS name, game_id, team, {', '.join(exprs)} FROM [{table_name}] "
+                f"WHERE [{key_col}] IN (SELECT name FROM temp.cumulative_names)"
+            )
+        if not branches:
+            return
+
+        per_game_sums = ", ".join(f"SUM({f}) AS {f}" for f in fields)
+        running_sums = ", ".join(f"SUM(p.{f}) OVER w" for f in fields)
+        key_cols = "player, team" if key_col == "player" else "team"
+        key_vals = "p.name, p.team" if key_col == "player" else "p.name"
+        # NFL seasons straddle New Year: January/February games belong to the previous season
+        rebuild_sql = f"""
+            INSERT INTO {target} ({key_cols}, game_id, season, week, date, seq, {', '.join(fields)})
+            SELECT {key_vals}, p.game_id,
+                   CAST(substr(g.date, 1, 4) AS INTEGER) - (CAST(substr(g.date, 6, 2) AS INTEGER) < 3),
+                   g.week, g.date, COUNT(*) OVER w, {running_sums}
+            FROM (
+                SELECT name, game_id, MAX(team) AS team, {per_game_sums}
+                FROM ({' UNION ALL '.join(branches)})
+                GROUP BY name, game_id
+            ) p
+            JOIN games g ON g.id = p.game_id
+            WINDOW w AS (PARTITION BY p.name ORDER BY g.date, p.game_id ROWS UNBOUNDED PRECEDING)
+        """
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS cumulative_names (name TEXT PRIMARY KEY)")
+        for start in range(0, len(names), CUMULATIVE_CHUNK_SIZE):
+            with self.transaction():
+                self.conn.execute("DELETE FROM temp.cumulative_names")
+                self.conn.executemany("INSERT OR IGNORE INTO temp.cumulative_names (name) VALUES (?)",
+                                      [(n,) for n in names[start:start + CUMULATIVE_CHUNK_SIZE]])
+                self.conn.execute(f"DELETE FROM {target} WHERE {key_col} IN (SELECT name FROM temp.cumulative_names)")
+                self.conn.execute(rebuild_sql)
+
+    def insert_game_teams(self, game_id, away_team, home_team, week, date):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO game_teams (game_id, team, opponent, home_away, week, date) VALUES (?, ?, ?, ?, ?, ?)",
+            [(game_id, away_team, home_team, "away", week, date),
+             (game_id, home_team, away_team, "home", week, date)],
+        )
 
     def insert_game(self, matchup, date, week, filename):
         cursor = self.conn.cursor()
@@ -60,7 +316,7 @@ class NFLStatsDatabase:
         return row[0] if row else None
 
     def insert_stats(self, table_name, game_id, team, stats_dict, player_name=None):
-        clean_name = f"{table_name.lower().replace(' ', '_')}_stats"
+        clean_name = self.stats_table_name(table_name)
         cursor = self.conn.cursor()
 
         stats_copy = stats_dict.copy()
@@ -69,13 +325,10 @@ class NFLStatsDatabase:
 
         keys = list(stats_copy.keys())
 
-        # 1. Create table if it doesn't exist
-        cursor.execute(f"CREATE TABLE IF NOT EXISTS [{clean_name}] (id INTEGER PRIMARY KEY AUTOINCREMENT, game_id INTEGER, team TEXT, player TEXT)")
-
-        # 2. Add any missing columns (like 'average')
-        self._ensure_columns(clean_name, keys)
+        # Normally a no-op: migrate_schema() has already created the table and columns
+        if not self._table_columns(clean_name).issuperset(keys):
+            self._ensure_columns(clean_name, keys)
 
-        # 3. Insert the data
         placeholders = ", ".join(["?"] * (len(keys) + 3))
         col_names = ", ".join([f"[{k}]" for k in keys])
         vals = [game_id, team, player_name] + [stats_copy.get(k) for k in keys]
@@ -83,53 +336,125 @@ class NFLStatsDatabase:
         cursor.execute(f"INSERT INTO [{clean_name}] (game_id, team, player, {col_names}) VALUES ({placeholders})", vals)
 
 class NFLStatsImporter:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, chunk_size=DEFAULT_CHUNK_SIZE):
         self.db = db_manager
+        self.chunk_size = max(1, chunk_size)
+        self._touched_players = set()
+        self._touched_teams = set()
 
-    def _import_file(self, file_path):
+    def _load(self, file_path):
         try:
             with open(file_path, 'r') as f:
-                data = json.load(f)
-
-            info = data.get("game_info", {})
-            scores = info.get("final_score", {})
-            team_names = list(scores.keys())
-            matchup = f"{team_names[0]} vs {team_names[1]}" if len(team_names) >= 2 else "Unknown"
-
-            # Date formatting
-            raw_date = info.get("date", "")
-            try:
-                formatted_date = datetime.strptime(raw_date, "%B %d, %Y").strftime("%Y-%m-%d")
-            except:
-                formatted_date = raw_date
-
-            game_id = self.db.insert_game(matchup, formatted_date, info.get("week"), file_path.name)
-
-            if info.get("teams") and game_id:
-                for team_name, categories in info["teams"].items():
-                    for cat_name, val in categories.items():
-                        if isinstance(val, list):
-                            for p_stats in val:
-                                self.db.insert_stats(cat_name, game_id, team_name, p_stats)
-                        elif isinstance(val, dict):
-                            self.db.insert_stats(cat_name, game_id, team_name, val, player_name="Team")
-
-            self.db.conn.commit()
-            logger.info(f"Processed: {file_path.name}")
+                return json.load(f)
         except Exception as e:
             logger.error(f"Failed {file_path.name}: {e}")
+            return None
+
+    def _collect_schema(self, data, schema):
+        """Records every stats table/column a file will write, so the schema can be migrated before inserts."""
+        info = data.get("game_info", {})
+        for categories in (info.get("teams") or {}).values():
+            for cat_name, val in categories.items():
+                if isinstance(val, list):
+                    rows = val
+                elif isinstance(val, dict):
+                    rows = [val]
+                else:
+                    continue
+                cols = schema.setdefault(self.db.stats_table_name(cat_name), set())
+                for row in rows:
+                    cols.update(k for k in row if k != 'player')
+
+    def _import_file(self, name, data):
+        try:
+            with self.db.savepoint("import_file"):
+                info = data.get("game_info", {})
+                scores = info.get("final_score", {})
+                team_names = list(scores.keys())
+                matchup = f"{team_names[0]} vs {team_names[1]}" if len(team_names) >= 2 else "Unknown"
+
+                # Date formatting
+                raw_date = info.get("date", "")
+                try:
+                    formatted_date = datetime.strptime(raw_date, "%B %d, %Y").strftime("%Y-%m-%d")
+                except:
+                    formatted_date = raw_date
+
+                game_id = self.db.insert_game(matchup, formatted_date, info.get("week"), name)
+                # final_score lists the away team first, the home team second
+                if game_id and len(team_names) >= 2:
+                    self.db.insert_game_teams(game_id, team_names[0], team_names[1], info.get("week"), formatted_date)
+
+                if info.get("teams") and game_id:
+                    for team_name, categories in info["teams"].items():
+                        for cat_name, val in categories.items():
+                            if isinstance(val, list):
+                                for p_stats in val:
+                                    self.db.insert_stats(cat_name, game_id, team_name, p_stats)
+                            elif isinstance(val, dict):
+                                self.db.insert_stats(cat_name, game_id, team_name, val, player_name="Team")
+                            if isinstance(val, list) and cat_name.lower() in ("rushing", "receiving"):
+                                self._touched_players.update(p.get("player") for p in val if p.get("player"))
+                        self._touched_teams.add(team_name)
+
+            logger.info(f"Processed: {name}")
+        except Exception as e:
+            logger.error(f"Failed {name}: {e}")
 
     def process_directory(self, folder):
-        files = list(Path(folder).rglob("*.json"))
-        for f in files:
-            self._import_file(f)
+        files = sorted(Path(folder).rglob("*.json"))
+        # Files are parsed once per pass rather than all held in memory
+        self._import_all(files, lambda f: (f.name, self._load(f)))
+
+    def import_documents(self, documents):
+        """Imports already-parsed game documents, given as a list of (name, data) pairs."""
+        self._import_all(documents, lambda doc: doc)
+
+    def _import_all(self, sources, load):
+        # 1. Schema pass: every table/column this import needs, applied in one migration step
+        schema = {}
+        for source in sources:
+            _, data = load(source)
+            if data is not None:
+                self._collect_schema(data, schema)
+        self.db.migrate_schema(schema)
+        self.db.index_player_tables()
+        self.db.backfill_game_teams()
+
+        # 2. Insert pass: one bounded transaction per chunk of files keeps the write lock short
+        for start in range(0, len(sources), self.chunk_size):
+            with self.db.transaction():
+                for source in sources[start:start + self.chunk_size]:
+                    name, data = load(source)
+                    if data is not None:
+                        self._import_file(name, data)
+
+        # 3. Running totals, only for the players/teams this import touched (everything on first build).
+        # Each table is checked on its own, so a DB with no defense rows still gets incremental player rebuilds.
+        if self.db.cumulative_needs_backfill("player_cumulative_stats"):
+            self.db.rebuild_player_cumulative()
+        else:
+            self.db.rebuild_player_cumulative(self._touched_players)
+        if self.db.cumulative_needs_backfill("team_cumulative_stats"):
+            self.db.rebuild_team_cumulative()
+        else:
+            self.db.rebuild_team_cumulative(self._touched_teams)
+        self._touched_players.clear()
+        self._touched_teams.clear()
+
+        if sources:
+            version = self.db.bump_data_version()
+            logger.info(f"Data version bumped to {version}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("folder", help="Path to JSON folder")
+    parser.add_argument("--db", default="NFL_Seasons_Stats.db", help="SQLite database to update")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Files committed per transaction")
     args = parser.parse_args()
 
-    db_manager = NFLStatsDatabase("NFL_Seasons_Stats.db")
-    importer = NFLStatsImporter(db_manager)
+    db_manager = NFLStatsDatabase(args.db)
+    importer = NFLStatsImporter(db_manager, chunk_size=args.chunk_size)
     importer.process_directory(args.folder)
     print("Database updated and schema evolved successfully!")
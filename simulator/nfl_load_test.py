@@ -0,0 +1,396 @@
+# File Name: nfl_load_test.py
+# Concurrent-user load test for the NFL simulator site (nfl/views.py).
+# Usage: python nfl_load_test.py --clients 20 --duration 60 --seasons 5 --players-per-team 6
+#        python nfl_load_test.py --base-url http://127.0.0.1:8000 --clients 50   (drive a server you already started)
+# Note: 1. By default this seeds a synthetic stats DB in a temp folder, starts a stand-in Ollama server
+#          (no GPU/model needed) and a Django server pointed at both (NFL_STATS_DB / OLLAMA_HOST), then
+#          drives the list, detail and simulate pages with N concurrent clients.
+#       2. --server uvicorn runs the ASGI app instead of runserver (pip install uvicorn).
+#       3. Reports p50/p95/p99 latency, throughput and error rate per endpoint.
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from nfl_synthetic_data import NFL_TEAMS, game_documents
+
+SIMULATOR_DIR = Path(__file__).resolve().parent
+
+# --- Stand-in Ollama server ---
+
+class FakeOllamaServer:
+    """Answers /api/chat and /api/generate like Ollama, after a configurable delay.
+
+    Each reply takes latency (time to first token, +/- jitter) plus
+    response_tokens / tokens_per_sec, so slow-model behaviour can be reproduced
+    without a GPU. Streaming requests get one NDJSON line per token.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=2.0, tokens_per_sec=40.0, response_tokens=80, jitter=0.2):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.response_tokens = response_tokens
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stat_line(self):
+        return {
+            "rush_attempts": random.randint(8, 24),
+            "rush_yards": random.randint(20, 140),
+            "rush_tds": random.randint(0, 2),
+            "receptions": random.randint(0, 6),
+            "receiving_yards": random.randint(0, 60),
+            "receiving_tds": random.randint(0, 1),
+            "notes": "synthetic response from the load-test model server",
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-loadtest"})
+                elif self.path == "/api/tags":
+                    self._send_json({"models": []})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json({"error": "invalid JSON"}, 400)
+                    return
+                if self.path not in ("/api/chat", "/api/generate"):
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                with server._lock:
+                    server.requests += 1
+
+                tokens = server.response_tokens
+                num_predict = (request.get("options") or {}).get("num_predict")
+                if num_predict:
+                    tokens = min(tokens, num_predict)
+                first_token = max(0.0, server.latency + random.uniform(-server.jitter, server.jitter))
+                per_token = 1.0 / server.tokens_per_sec if server.tokens_per_sec > 0 else 0.0
+                text = json.dumps(server.stat_line())
+                model = request.get("model", "loadtest")
+                chat = self.path == "/api/chat"
+
+                def chunk(content, done):
+                    payload = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), "done": done}
+                    if chat:
+                        payload["message"] = {"role": "assistant", "content": content}
+                    else:
+                        payload["response"] = content
+                    if done:
+                        payload.update({"done_reason": "stop", "eval_count": tokens,
+                                        "eval_duration": int(tokens * per_token * 1e9)})
+                    return payload
+
+                time.sleep(first_token)
+                if request.get("stream", True):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    step = max(1, len(text) // max(1, tokens))
+                    pieces = [text[i:i + step] for i in range(0, len(text), step)]
+                    for piece in pieces:
+                        time.sleep(per_token)
+                        line = (json.dumps(chunk(piece, False)) + "\n").encode()
+                        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                    line = (json.dumps(chunk("", True)) + "\n").encode()
+                    self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n0\r\n\r\n")
+                else:
+                    time.sleep(per_token * tokens)
+                    self._send_json(chunk(text, True))
+
+        return Handler
+
+# --- Synthetic stats database ---
+
+def seed_database(db_path, seasons, players_per_team):
+    # Imported here: nfl_data_manager configures file logging at import time
+    sys.path.insert(0, str(SIMULATOR_DIR))
+    from nfl_data_manager import NFLStatsDatabase, NFLStatsImporter
+
+    documents = list(game_documents(seasons, players_per_team))
+    db = NFLStatsDatabase(str(db_path))
+    NFLStatsImporter(db, chunk_size=200).import_documents(documents)
+    db.conn.close()
+    return len(documents)
+
+# --- Django server under test ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_django(server, port, db_path, ollama_url, log_path):
+    env = dict(os.environ, NFL_STATS_DB=str(db_path), OLLAMA_HOST=ollama_url)
+    if server == "uvicorn":
+        cmd = [sys.executable, "-m", "uvicorn", "simulator.asgi:application",
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "manage.py", "runserver", "--noreload", f"127.0.0.1:{port}"]
+    # runserver logs every request to stderr, so it goes to a file rather than an unread pipe
+    with open(log_path, "w") as log:
+        return subprocess.Popen(cmd, cwd=SIMULATOR_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_up(base_url, process=None, log_path=None, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            log = Path(log_path).read_text(errors="replace") if log_path else ""
+            raise RuntimeError(f"server exited:\n{log}")
+        try:
+            with urllib.request.urlopen(base_url + "/", timeout=2):
+                return
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.25)
+    raise RuntimeError(f"server at {base_url} did not come up within {timeout}s")
+
+# --- Clients ---
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+PLAYER_LINK_RE = re.compile(r'href="/running_backs/([^"]+)/"')
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def client_loop(base_url, players, mix, deadline, max_requests, results, timeout, counter, rng):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    endpoints, weights = zip(*mix.items())
+
+    def fetch(endpoint, url, data=None):
+        start = time.perf_counter()
+        ok = False
+        body = ""
+        try:
+            with opener.open(url, data=data, timeout=timeout) as resp:
+                body = resp.read().decode("utf-8", errors="replace")
+                ok = resp.status == 200
+        except (urllib.error.URLError, ConnectionError, socket.timeout, OSError):
+            ok = False
+        # simulation failures render an error page with status 200
+        if ok and endpoint == "simulate" and "Simulation error" in body:
+            ok = False
+        results.record(endpoint, time.perf_counter() - start, ok)
+        return body
+
+    while time.time() < deadline:
+        with counter["lock"]:
+            if max_requests and counter["sent"] >= max_requests:
+                return
+            counter["sent"] += 1
+        endpoint = rng.choices(endpoints, weights)[0]
+        player = rng.choice(players)
+        detail_url = f"{base_url}/running_backs/{player}/"
+        if endpoint == "list":
+            fetch("list", f"{base_url}/running_backs/")
+        elif endpoint == "detail":
+            fetch("detail", detail_url)
+        else:
+            # the form needs a CSRF token from the detail page (not timed as part of simulate);
+            # if that fetch fails the simulate attempt counts as an error
+            start = time.perf_counter()
+            try:
+                with opener.open(detail_url, timeout=timeout) as resp:
+                    page = resp.read().decode("utf-8", errors="replace")
+            except (urllib.error.URLError, ConnectionError, socket.timeout, OSError):
+                results.record("simulate", time.perf_counter() - start, False)
+                continue
+            match = CSRF_RE.search(page)
+            form = {"csrfmiddlewaretoken": match.group(1) if match else "",
+                    "opponent_team": rng.choice(NFL_TEAMS)}
+            fetch("simulate", detail_url + "simulate/", urllib.parse.urlencode(form).encode())
+
+
+def run_load(base_url, clients, duration, max_requests, mix, timeout, seed=0):
+    with urllib.request.urlopen(base_url + "/running_backs/", timeout=timeout) as resp:
+        players = PLAYER_LINK_RE.findall(resp.read().decode("utf-8", errors="replace"))
+    if not players:
+        raise RuntimeError("no players listed at /running_backs/; is the database seeded?")
+
+    results = Results()
+    counter = {"lock": threading.Lock(), "sent": 0}
+    deadline = time.time() + duration
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=client_loop, daemon=True,
+                         args=(base_url, players, mix, deadline, max_requests, results, timeout, counter,
+                               random.Random(seed + i)))
+        for i in range(clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - started
+
+
+def report(results, elapsed):
+    rows = {}
+    for endpoint, values in sorted(results.latencies.items()):
+        values = sorted(values)
+        errors = results.errors.get(endpoint, 0)
+        rows[endpoint] = {
+            "requests": len(values),
+            "errors": errors,
+            "error_rate": errors / len(values) if values else 0.0,
+            "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": values[-1] * 1000 if values else 0.0,
+        }
+    total = sum(r["requests"] for r in rows.values())
+    total_errors = sum(r["errors"] for r in rows.values())
+    summary = {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "error_rate": total_errors / total if total else 0.0,
+        "endpoints": rows,
+    }
+
+    print(f"\n{'endpoint':<10}{'reqs':>8}{'err%':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, r in rows.items():
+        print(f"{endpoint:<10}{r['requests']:>8}{r['error_rate'] * 100:>7.1f}%{r['throughput_rps']:>9.2f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}")
+    print(f"\n{total} requests in {elapsed:.1f}s: {summary['throughput_rps']:.2f} req/s, "
+          f"{summary['error_rate'] * 100:.1f}% errors")
+    return summary
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("list", "detail", "simulate"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the NFL simulator site")
+    parser.add_argument("--base-url", help="Drive an already running server instead of starting one")
+    parser.add_argument("--server", choices=["runserver", "uvicorn"], default="runserver")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = no limit)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("list=3,detail=5,simulate=2"),
+                        help="Endpoint weights, e.g. list=3,detail=5,simulate=2")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds")
+    parser.add_argument("--seasons", type=int, default=2, help="Synthetic seasons to seed")
+    parser.add_argument("--players-per-team", type=int, default=4, help="Synthetic running backs per team")
+    parser.add_argument("--db", help="Use/seed this stats DB instead of a temporary one")
+    parser.add_argument("--model-latency", type=float, default=2.0, help="Fake model time to first token (s)")
+    parser.add_argument("--model-tokens-per-sec", type=float, default=40.0, help="Fake model generation rate")
+    parser.add_argument("--model-tokens", type=int, default=80, help="Tokens per fake model reply")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    model_server = None
+    django = None
+    try:
+        base_url = args.base_url.rstrip("/") if args.base_url else None
+        if base_url is None:
+            db_path = Path(args.db) if args.db else Path(tempfile.mkdtemp(prefix="nfl_load_")) / "load_test.db"
+            if not db_path.exists():
+                t0 = time.perf_counter()
+                games = seed_database(db_path, args.seasons, args.players_per_team)
+                print(f"Seeded {games} games ({args.seasons} seasons x 32 teams x {args.players_per_team} players) "
+                      f"into {db_path} in {time.perf_counter() - t0:.1f}s")
+
+            model_server = FakeOllamaServer(latency=args.model_latency, tokens_per_sec=args.model_tokens_per_sec,
+                                            response_tokens=args.model_tokens).start()
+            port = free_port()
+            log_path = db_path.with_suffix(".server.log")
+            django = start_django(args.server, port, db_path, model_server.url, log_path)
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_up(base_url, django, log_path)
+            print(f"Serving {base_url} ({args.server}) with fake model at {model_server.url}")
+
+        print(f"Driving {args.clients} clients for {args.duration:.0f}s, mix {args.mix}")
+        results, elapsed = run_load(base_url, args.clients, args.duration, args.requests, args.mix, args.timeout)
+        summary = report(results, elapsed)
+        if model_server is not None:
+            summary["model_requests"] = model_server.requests
+        if args.json:
+            Path(args.json).write_text(json.dumps(summary, indent=2))
+    finally:
+        if django is not None:
+            django.terminate()
+            django.wait(timeout=10)
+        if model_server is not None:
+            model_server.stop()
@@ -0,0 +1,301 @@
+# File Name: nfl_synthetic_data.py
+# Synthetic season trees for nfl_data_manager.py, and an ingest benchmark built on them.
+# Usage: python nfl_synthetic_data.py generate ./synthetic_nfl --seasons 10 --players-per-team 8
+#        python nfl_synthetic_data.py benchmark --scales 1,5,10,20 --players-per-team 8 --plays-per-game 150
+# Note: 1. Files follow the scraped layout: <season>_season/week_<n>/<away>_<home>_week_<n>.json, each with
+#          game_info / final_score / teams / <category> lists, the same shape NFLStatsImporter reads.
+#       2. Every team block has the passing / rushing / receiving / kicking / defense categories of the real files.
+#          --variation-rate mixes in the format differences seen between real seasons (missing 'average'
+#          columns, defense numbers as strings or ints, ISO vs long dates, unnamed players, new stat columns
+#          and categories) so the schema-evolving paths get exercised too.
+#       3. --plays-per-game adds a play-by-play sized 'plays' category per team to stress wide/long tables.
+#       4. benchmark imports each scale into a fresh DB in a child process and reports rows/sec, peak memory
+#          (max RSS) and the resulting DB size.
+
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+NFL_TEAMS = [
+    "Arizona Cardinals","Atlanta Falcons","Baltimore Ravens","Buffalo Bills",
+    "Carolina Panthers","Chicago Bears","Cincinnati Bengals","Cleveland Browns",
+    "Dallas Cowboys","Denver Broncos","Detroit Lions","Green Bay Packers",
+    "Houston Texans","Indianapolis Colts","Jacksonville Jaguars","Kansas City Chiefs",
+    "Las Vegas Raiders","Los Angeles Chargers","Los Angeles Rams","Miami Dolphins",
+    "Minnesota Vikings","New England Patriots","New Orleans Saints","New York Giants",
+    "New York Jets","Philadelphia Eagles","Pittsburgh Steelers","San Francisco 49ers",
+    "Seattle Seahawks","Tampa Bay Buccaneers","Tennessee Titans","Washington Commanders",
+]
+
+# Stat columns that only show up in some files, as new scrapes add fields
+EXTRA_RUSHING_COLUMNS = ("fumbles", "yards_before_contact")
+EXTRA_RECEIVING_COLUMNS = ("drops", "air_yards")
+
+
+def short_name(team):
+    return team.split()[-1].lower()
+
+
+def game_documents(seasons, players_per_team, first_season=2024, weeks=17, plays_per_game=0,
+                   variation_rate=0.0, seed=0):
+    """Yield (relative_path, data) for every game, season by season, week by week."""
+    rng = random.Random(seed)
+    rosters = {
+        team: [f"{team.split()[-1]} Back {i + 1}" for i in range(players_per_team)]
+        for team in NFL_TEAMS
+    }
+    for season in range(first_season, first_season + seasons):
+        kickoff = date(season, 9, 7)
+        for week in range(1, weeks + 1):
+            teams = NFL_TEAMS[:]
+            rng.shuffle(teams)
+            game_day = kickoff + timedelta(weeks=week - 1)
+            for away, home in zip(teams[::2], teams[1::2]):
+                vary = rng.random() < variation_rate
+                teams_block = {team: _team_block(rng, rosters[team], plays_per_game, vary) for team in (home, away)}
+                if vary and rng.random() < 0.3:
+                    game_date = game_day.isoformat()
+                else:
+                    game_date = f"{game_day.strftime('%B')} {game_day.day}, {game_day.year}"
+                data = {"game_info": {
+                    "final_score": {away: teams_block[away]["score"], home: teams_block[home]["score"]},
+                    "team_scores_by_quarter": {t: _quarters(rng, teams_block[t]["score"]) for t in (away, home)},
+                    "week": week,
+                    "date": game_date,
+                    "location": f"{home} Stadium",
+                    "teams": teams_block,
+                }}
+                path = f"{season}_season/week_{week}/{short_name(away)}_{short_name(home)}_week_{week}.json"
+                yield path, data
+
+
+def _quarters(rng, score):
+    cuts = sorted(rng.randint(0, score) for _ in range(3))
+    return [cuts[0], cuts[1] - cuts[0], cuts[2] - cuts[1], score - cuts[2]]
+
+
+def _team_block(rng, roster, plays_per_game, vary):
+    nickname = roster[0].split()[0] if roster else "Team"
+    attempts = rng.randint(18, 45)
+    completions = rng.randint(attempts // 2, attempts)
+    sacks = rng.randint(0, 5)
+    passing = [{"player": f"{nickname} QB", "attempts": attempts, "completions": completions,
+                "yards": completions * rng.randint(6, 13), "touchdowns": rng.randint(0, 3),
+                "interceptions": rng.randint(0, 2), "long": rng.randint(15, 65), "sacks": sacks,
+                "loss": sacks * rng.randint(4, 9), "rate": round(rng.uniform(50, 130), 1)}]
+    fg_att = rng.randint(0, 4)
+    pat_att = rng.randint(0, 5)
+    kicking = [{"player": f"{nickname} Kicker", "pat_made": rng.randint(max(0, pat_att - 1), pat_att),
+                "pat_att": pat_att, "fg_made": rng.randint(max(0, fg_att - 1), fg_att), "fg_att": fg_att,
+                "long": rng.randint(20, 55) if fg_att else 0, "points": 0}]
+    kicking[0]["points"] = kicking[0]["pat_made"] + 3 * kicking[0]["fg_made"]
+
+    rushing, receiving = [], []
+    for player in roster:
+        attempts = rng.randint(0, 22)
+        yards = max(-5, int(rng.gauss(attempts * 4.3, 12)))
+        row = {"player": player, "attempts": attempts, "yards": yards,
+               "average": round(yards / attempts, 2) if attempts else 0.0,
+               "long": max(0, yards // 3), "touchdowns": rng.choice([0, 0, 0, 1]),
+               "first_downs": attempts // 4}
+        rushing.append(row)
+
+        targets = rng.randint(0, 6)
+        receptions = rng.randint(0, targets)
+        rec_yards = receptions * rng.randint(3, 12)
+        receiving.append({"player": player, "receptions": receptions, "yards": rec_yards,
+                          "average": round(rec_yards / receptions, 2) if receptions else 0.0,
+                          "long": rec_yards // 2, "touchdowns": rng.choice([0, 0, 0, 0, 1]),
+                          "first_downs": receptions // 2, "targets": targets,
+                          "yards_after_catch": rec_yards // 3})
+
+    rush_allowed = rng.randint(50, 180)
+    pass_allowed = rng.randint(120, 320)
+    defense = {"rush_yards_allowed": str(rush_allowed), "pass_yards_allowed": str(pass_allowed),
+               "total_yards_allowed": str(rush_allowed + pass_allowed)}
+    # same category order as the scraped files
+    block = {"score": rng.randint(0, 40), "passing": passing, "rushing": rushing, "receiving": receiving,
+             "kicking": kicking}
+
+    if vary:
+        variation = rng.randrange(5)
+        if variation == 0:
+            # older scrapes had no per-row average
+            for row in rushing + receiving:
+                row.pop("average", None)
+        elif variation == 1:
+            # defense numbers as ints rather than strings
+            defense = {k: int(v) for k, v in defense.items()}
+        elif variation == 2:
+            # newer scrapes add columns
+            for row in rushing:
+                row.update({c: rng.randint(0, 3) for c in EXTRA_RUSHING_COLUMNS})
+            for row in receiving:
+                row.update({c: rng.randint(0, 2) for c in EXTRA_RECEIVING_COLUMNS})
+        elif variation == 3:
+            # a row the scraper could not name
+            receiving.append({"player": "", "receptions": 1, "yards": rng.randint(0, 15), "long": 5,
+                              "touchdowns": 0, "first_downs": 0, "targets": 1, "yards_after_catch": 1})
+        else:
+            # a category the importer has never seen, as a new table
+            punts = rng.randint(1, 7)
+            punt_yards = punts * rng.randint(38, 52)
+            block["punting"] = [{"player": f"{nickname} Punter", "punts": punts, "yards": punt_yards,
+                                 "average": round(punt_yards / punts, 1), "long": rng.randint(45, 70),
+                                 "inside_20": rng.randint(0, punts)}]
+    block["defense"] = defense
+
+    if plays_per_game:
+        block["plays"] = [
+            {"player": rng.choice(roster), "quarter": 1 + i * 4 // plays_per_game, "down": rng.randint(1, 4),
+             "distance": rng.randint(1, 15), "yard_line": rng.randint(1, 99), "yards": rng.randint(-5, 30),
+             "play_type": rng.choice((1, 2))}
+            for i in range(plays_per_game)
+        ]
+    return block
+
+
+def write_tree(out_dir, documents):
+    out_dir = Path(out_dir)
+    count = 0
+    for rel_path, data in documents:
+        path = out_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        count += 1
+    return count
+
+# --- Benchmark ---
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def db_size_mb(db_path):
+    total = 0
+    for suffix in ("", "-wal", "-shm"):
+        path = Path(f"{db_path}{suffix}")
+        if path.exists():
+            total += path.stat().st_size
+    return total / (1024 * 1024)
+
+
+def ingest(folder, db_path, chunk_size):
+    """Child-process side of the benchmark: import one tree and print the measurements as JSON."""
+    import logging
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from nfl_data_manager import NFLStatsDatabase, NFLStatsImporter
+    logging.getLogger("nfl_data_manager").setLevel(logging.WARNING)
+
+    db = NFLStatsDatabase(str(db_path))
+    start = time.perf_counter()
+    NFLStatsImporter(db, chunk_size=chunk_size).process_directory(folder)
+    elapsed = time.perf_counter() - start
+
+    tables = [row[0] for row in db.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_stats' ESCAPE '\\'")]
+    stat_tables = [t for t in tables if "cumulative" not in t]
+    rows = sum(db.conn.execute(f"SELECT COUNT(*) FROM [{t}]").fetchone()[0] for t in stat_tables)
+    games = db.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.conn.close()
+    print(json.dumps({"elapsed_s": elapsed, "games": games, "rows": rows, "tables": len(stat_tables),
+                      "peak_rss_mb": peak_rss_mb(), "db_mb": db_size_mb(db_path)}))
+
+
+def benchmark(scales, players_per_team, plays_per_game, variation_rate, chunk_size, keep_dir=None):
+    work_dir = Path(keep_dir).resolve() if keep_dir else Path(tempfile.mkdtemp(prefix="nfl_bench_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    try:
+        for seasons in scales:
+            tree = work_dir / f"seasons_{seasons}"
+            db_path = work_dir / f"seasons_{seasons}.db"
+            if tree.exists():
+                shutil.rmtree(tree)
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+            t0 = time.perf_counter()
+            files = write_tree(tree, game_documents(seasons, players_per_team, plays_per_game=plays_per_game,
+                                                    variation_rate=variation_rate))
+            generate_s = time.perf_counter() - t0
+
+            # A fresh process per scale so max RSS is this import's alone; run in work_dir so the
+            # importer's nfl_pipeline.log lands there rather than next to the real data
+            child = subprocess.run(
+                [sys.executable, str(Path(__file__).resolve()), "_ingest", str(tree), str(db_path),
+                 "--chunk-size", str(chunk_size)],
+                capture_output=True, text=True, check=True, cwd=work_dir,
+            )
+            measured = json.loads(child.stdout.strip().splitlines()[-1])
+            measured.update({"seasons": seasons, "files": files, "generate_s": generate_s,
+                             "rows_per_s": measured["rows"] / measured["elapsed_s"] if measured["elapsed_s"] else 0.0})
+            results.append(measured)
+            rss = f"{measured['peak_rss_mb']:.0f}" if measured["peak_rss_mb"] is not None else "n/a"
+            print(f"{seasons:>7}{files:>8}{measured['rows']:>11}{measured['elapsed_s']:>10.2f}"
+                  f"{measured['rows_per_s']:>12.0f}{rss:>11}{measured['db_mb']:>10.1f}", flush=True)
+    finally:
+        if not keep_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic NFL season trees and benchmark ingestion")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_shape_args(p):
+        p.add_argument("--players-per-team", type=int, default=6)
+        p.add_argument("--plays-per-game", type=int, default=0, help="Rows in a per-team 'plays' category")
+        p.add_argument("--variation-rate", type=float, default=0.1,
+                       help="Fraction of games using an alternate schema variant")
+
+    gen = sub.add_parser("generate", help="Write a season tree of game JSON files")
+    gen.add_argument("out_dir")
+    gen.add_argument("--seasons", type=int, default=2)
+    gen.add_argument("--first-season", type=int, default=2024)
+    gen.add_argument("--seed", type=int, default=0)
+    add_shape_args(gen)
+
+    bench = sub.add_parser("benchmark", help="Import increasing scales and report rows/sec, memory and DB size")
+    bench.add_argument("--scales", default="1,2,5,10", help="Comma-separated season counts")
+    bench.add_argument("--chunk-size", type=int, default=50, help="Files per import transaction")
+    bench.add_argument("--keep", help="Keep generated trees and DBs in this folder")
+    bench.add_argument("--json", help="Also write the results to this JSON file")
+    add_shape_args(bench)
+
+    child = sub.add_parser("_ingest", help=argparse.SUPPRESS)
+    child.add_argument("folder")
+    child.add_argument("db")
+    child.add_argument("--chunk-size", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        count = write_tree(args.out_dir, game_documents(
+            args.seasons, args.players_per_team, first_season=args.first_season, plays_per_game=args.plays_per_game,
+            variation_rate=args.variation_rate, seed=args.seed))
+        print(f"Wrote {count} game files to {args.out_dir}")
+    elif args.command == "benchmark":
+        scales = [int(s) for s in args.scales.split(",") if s.strip()]
+        print(f"{'seasons':>7}{'files':>8}{'rows':>11}{'ingest s':>10}{'rows/sec':>12}{'peak MB':>11}{'DB MB':>10}")
+        results = benchmark(scales, args.players_per_team, args.plays_per_game, args.variation_rate,
+                            args.chunk_size, args.keep)
+        if args.json:
+            Path(args.json).write_text(json.dumps(results, indent=2))
+    else:
+        ingest(args.folder, args.db, args.chunk_size)
@@ -6,10 +6,14 @@
 #       3. Load the module llama3, run the command: ollama pull llama3 in the terminal, before running this script.
 #       4. This script will alert the user wether the response was first time or cache was used.
 #       5. To support cut and pasting and multi-lines be sure to enter the command in your terminal: pip install prompt_toolkit
+#       6. SESSION = True keeps the conversation: each turn goes to ollama.chat with the full message history, so
+#          follow-ups can refer back and Ollama reuses the KV cache for the unchanged prefix instead of re-reading it.
+#          Old turns are dropped once the history nears NUM_CTX tokens. Type /reset to start a new conversation.
 
 import ollama
 import redis
 import hashlib
+import json
 from datetime import datetime
 from prompt_toolkit import prompt
 
@@ -24,8 +28,12 @@ class CacheManager:
             print("--- [Redis Offline: Caching Disabled] ---")
         self.ttl = ttl
 
-    def generate_key(self, model, prompt):
+    def generate_key(self, model, prompt, history=None):
         key_data = f"{model}:{prompt.strip().lower()}"
+        if history:
+            # In a session the same question can mean something else, so key on what came before it too
+            history_hash = hashlib.sha256(json.dumps(history, sort_keys=True).encode()).hexdigest()
+            key_data += f":{history_hash}"
         return hashlib.sha256(key_data.encode()).hexdigest()
 
     def get_cached_response(self, key):
@@ -35,15 +43,40 @@ class CacheManager:
         if self.enabled: self.client.setex(key, self.ttl, response)
 
 class OllamaChat:
-    def __init__(self, model='llama3', cache_manager=None):
+    def __init__(self, model='llama3', cache_manager=None, session=False, num_ctx=8192, keep_alive='30m',
+                 reply_reserve=1024):
         self.model = model
         self.cache = cache_manager
+        self.session = session
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive  # keeps the model (and its KV cache) loaded between turns
+        self.reply_reserve = reply_reserve  # tokens left free for the answer
+        self.history = []
         # Tell the AI what today's date is
         self.system_context = f"You are a helpful assistant. Today's date is {datetime.now().strftime('%B %d, %Y')}. "
 
+    def reset(self):
+        self.history = []
+
+    @staticmethod
+    def estimate_tokens(text):
+        return len(text) // 4 + 1  # rough, ~4 chars per token for English
+
+    def trim_history(self, prompt):
+        # Drop whole question/answer pairs from the front, keeping the system message. Trimming changes the
+        # prefix Ollama has cached, so cut down to 3/4 of the budget to get several cheap turns before the next cut.
+        budget = self.num_ctx - self.reply_reserve
+        fixed = self.estimate_tokens(self.system_context) + self.estimate_tokens(prompt)
+        sizes = [self.estimate_tokens(m['content']) for m in self.history]
+        if fixed + sum(sizes) <= budget:
+            return
+        while self.history and fixed + sum(sizes) > budget * 3 // 4:
+            del self.history[:2]
+            del sizes[:2]
+
     def ask(self, prompt):
-        # We combine context + prompt for the AI, but maybe just prompt for the cache key
-        full_prompt = self.system_context + prompt
+        if self.session:
+            return self._ask_session(prompt)
 
         if self.cache:
             key = self.cache.generate_key(self.model, prompt)
@@ -52,7 +85,9 @@ class OllamaChat:
                 return cached_val, True
 
         try:
-            response = ollama.generate(model=self.model, prompt=full_prompt)
+            # Passing the system prompt separately keeps it a fixed prefix of the model's template
+            response = ollama.generate(model=self.model, prompt=prompt, system=self.system_context,
+                                       keep_alive=self.keep_alive)
             result = response['response']
             if self.cache:
                 key = self.cache.generate_key(self.model, prompt)
@@ -61,14 +96,40 @@ class OllamaChat:
         except Exception as e:
             return f"Error: {str(e)}", False
 
+    def _ask_session(self, prompt):
+        self.trim_history(prompt)
+        key = None
+        if self.cache:
+            key = self.cache.generate_key(self.model, prompt, self.history)
+            cached_val = self.cache.get_cached_response(key)
+            if cached_val:
+                self.history += [{'role': 'user', 'content': prompt}, {'role': 'assistant', 'content': cached_val}]
+                return cached_val, True
+
+        # Same system message and history every turn, so Ollama only has to encode the new question
+        messages = [{'role': 'system', 'content': self.system_context}] + self.history + \
+            [{'role': 'user', 'content': prompt}]
+        try:
+            response = ollama.chat(model=self.model, messages=messages, keep_alive=self.keep_alive,
+                                   options={'num_ctx': self.num_ctx})
+            result = response['message']['content']
+            if key:
+                self.cache.set_cache(key, result)
+            self.history += [{'role': 'user', 'content': prompt}, {'role': 'assistant', 'content': result}]
+            return result, False
+        except Exception as e:
+            return f"Error: {str(e)}", False
+
 if __name__ == "__main__":
     MODEL = 'llama3' # Ensure this matches your 'ollama list'
+    SESSION = True   # False = every question stands alone
+    NUM_CTX = 8192   # context window to ask Ollama for; history is trimmed to fit
     cm = CacheManager(ttl=600)
-    bot = OllamaChat(model=MODEL, cache_manager=cm)
+    bot = OllamaChat(model=MODEL, cache_manager=cm, session=SESSION, num_ctx=NUM_CTX)
 
     print(f"--- NFL Research Bot (Model: {MODEL}) ---")
     print("Today is:", datetime.now().strftime('%B %d, %Y'))
-    print("Type 'exit' to quit.\n")
+    print("Type 'exit' to quit" + (", '/reset' to start a new conversation.\n" if SESSION else ".\n"))
 
     while True:
         # prompt() handles system-level paste buffers much better than input()
@@ -78,6 +139,10 @@ if __name__ == "__main__":
             break
         if not user_input.strip():
             continue
+        if user_input.strip().lower() == '/reset':
+            bot.reset()
+            print("--- [Conversation reset] ---\n")
+            continue
 
         # 2. Pass that SAME variable to the bot
         answer, was_cached = bot.ask(user_input)
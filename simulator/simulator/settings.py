@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'nfl.profiling.RequestProfilingMiddleware',  # inert unless NFL_PROFILING is True
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +52,38 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query/model/render timings in a Server-Timing header, with the
+# last NFL_PROFILING_BUFFER_SIZE requests at /debug/profiles/ (DEBUG or staff users only).
+NFL_PROFILING = False
+NFL_PROFILING_BUFFER_SIZE = 200
+
+# Ollama model used by the single-game simulation. Measured alternatives:
+#   glm-4.7-flash:latest  works well, 169 seconds response
+#   gemma3:1b             no json, but had notes, 8.5 seconds response
+#   deepseek-r1:1.5b      way off in the numbers, 15 second response
+#   llava:7b              no json and no notes, 43 second response
+#   llama3.3:latest       works well, 385 second response
+NFL_SIMULATION_MODEL = 'qwen3-coder:latest'  # works well and only 22.5 second response
+
+# Structured mode constrains the reply to the stat-line JSON schema and caps
+# generation at NFL_SIMULATION_NUM_PREDICT tokens (see nfl/simulation.py).
+NFL_SIMULATION_STRUCTURED = True
+NFL_SIMULATION_NUM_PREDICT = 192
+NFL_SIMULATION_TEMPERATURE = 0.4
+
+# Games in the "recent form" window shown on the detail page and sent to the model.
+NFL_RECENT_FORM_GAMES = 4
+
+# The simulate and detail views are async, so a waiting simulation is a
+# suspended coroutine rather than a blocked worker. Under ASGI (simulator.asgi)
+# Django still parks one idle sync thread per in-flight request (its
+# request_started receivers run through sync_to_async), so threads track
+# concurrent requests. At most NFL_SIMULATION_MAX_CONCURRENCY requests are in
+# flight to Ollama at once and the rest queue in-process.
+# OLLAMA_HOST = 'http://127.0.0.1:11434'  # default: the OLLAMA_HOST env var
+NFL_SIMULATION_MAX_CONCURRENCY = 16
+NFL_SIMULATION_TIMEOUT = 300
+
 ROOT_URLCONF = 'simulator.urls'
 
 TEMPLATES = [
@@ -73,10 +107,44 @@ WSGI_APPLICATION = 'simulator.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# nfl_data_manager.py writes to this same file while the site is serving, so
+# every connection runs in WAL mode (readers never block on the importer) with
+# the same pragmas as SQLITE_PRAGMAS in nfl_data_manager.py.
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'NFL_Seasons_Stats.db',
+        # NFL_STATS_DB points the site at another stats file (e.g. a load-test database)
+        'NAME': os.environ.get('NFL_STATS_DB', BASE_DIR / 'NFL_Seasons_Stats.db'),
+        'OPTIONS': {
+            'timeout': 30,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA cache_size=-64000;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Entries never expire on a timer: nfl/caching.py puts the importer's data
+# version in every key, so a new import makes the old entries unreachable and
+# MAX_ENTRIES culls them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nfl-stats',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
     }
 }
 
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import image_shopping_rater
+from image_shopping_rater import rescan_changed_dirs, scan_images
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb"):
+        pass
+
+
+def bump_mtime(directory):
+    # make the change visible even on filesystems with coarse mtimes
+    later = time.time() + 10
+    os.utime(directory, (later, later))
+
+
+class ScanAndWatchTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        for rel in ("a.jpg", "b.png", "notes.txt", os.path.join("sub", "c.webp"), os.path.join("sub", "deep", "d.JPEG")):
+            touch(os.path.join(self.root, rel))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def scan(self, root=None):
+        dir_mtimes = {}
+        found = [p for batch in scan_images(root or self.root, dir_mtimes) for p in batch]
+        return found, dir_mtimes
+
+    def test_scan_lists_images_relative_to_root(self):
+        found, dir_mtimes = self.scan()
+        self.assertEqual(found, ["a.jpg", "b.png", os.path.join("sub", "c.webp"),
+                                 os.path.join("sub", "deep", "d.JPEG")])
+        self.assertEqual(set(dir_mtimes), {self.root, os.path.join(self.root, "sub"),
+                                           os.path.join(self.root, "sub", "deep")})
+
+    def test_unchanged_tree_reports_nothing(self):
+        found, dir_mtimes = self.scan()
+        self.assertEqual(rescan_changed_dirs(self.root, dir_mtimes, set(found))[:2], ([], []))
+
+    def test_removals_at_top_level_and_in_subfolders(self):
+        found, dir_mtimes = self.scan()
+        os.remove(os.path.join(self.root, "a.jpg"))
+        os.remove(os.path.join(self.root, "sub", "c.webp"))
+        bump_mtime(self.root)
+        bump_mtime(os.path.join(self.root, "sub"))
+
+        added, removed, _ = rescan_changed_dirs(self.root, dir_mtimes, set(found))
+        self.assertEqual(added, [])
+        self.assertEqual(sorted(removed), ["a.jpg", os.path.join("sub", "c.webp")])
+
+    def test_trailing_separator_on_chosen_folder(self):
+        found, dir_mtimes = self.scan(self.root + os.sep)
+        os.remove(os.path.join(self.root, "b.png"))
+        bump_mtime(self.root)
+
+        added, removed, _ = rescan_changed_dirs(self.root + os.sep, dir_mtimes, set(found))
+        self.assertEqual((added, removed), ([], ["b.png"]))
+
+    def test_new_files_and_new_subfolders(self):
+        found, dir_mtimes = self.scan()
+        touch(os.path.join(self.root, "e.jpg"))
+        touch(os.path.join(self.root, "new", "f.png"))
+        bump_mtime(self.root)
+
+        added, removed, new_mtimes = rescan_changed_dirs(self.root, dir_mtimes, set(found))
+        self.assertEqual(sorted(added), ["e.jpg", os.path.join("new", "f.png")])
+        self.assertEqual(removed, [])
+        self.assertIn(os.path.join(self.root, "new"), new_mtimes)
+
+    def test_deleted_subfolder(self):
+        found, dir_mtimes = self.scan()
+        os.remove(os.path.join(self.root, "sub", "deep", "d.JPEG"))
+        os.rmdir(os.path.join(self.root, "sub", "deep"))
+        bump_mtime(os.path.join(self.root, "sub"))
+
+        added, removed, new_mtimes = rescan_changed_dirs(self.root, dir_mtimes, set(found))
+        self.assertEqual((added, removed), ([], [os.path.join("sub", "deep", "d.JPEG")]))
+        self.assertNotIn(os.path.join(self.root, "sub", "deep"), new_mtimes)
+
+    def test_failed_listing_is_retried_next_time(self):
+        found, dir_mtimes = self.scan()
+        touch(os.path.join(self.root, "e.jpg"))
+        bump_mtime(self.root)
+
+        real_scandir = os.scandir
+        failures = []
+
+        def scandir_failing_once(path):
+            if os.path.normpath(path) == self.root and not failures:
+                failures.append(path)
+                raise PermissionError(path)
+            return real_scandir(path)
+
+        with mock.patch.object(image_shopping_rater.os, "scandir", side_effect=scandir_failing_once):
+            added, removed, dir_mtimes = rescan_changed_dirs(self.root, dir_mtimes, set(found))
+        self.assertEqual((added, removed), ([], []))
+
+        added, removed, _ = rescan_changed_dirs(self.root, dir_mtimes, set(found))
+        self.assertEqual((added, removed), (["e.jpg"], []))
+
+
+if __name__ == "__main__":
+    unittest.main()